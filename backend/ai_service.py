@@ -1,72 +1,205 @@
 import os
 import json
-import requests
-import datetime
-from google.oauth2 import service_account
-import google.auth.transport.requests
+import time
+import hashlib
+import threading
+from concurrent.futures import ThreadPoolExecutor
+# requests and google-auth are imported on first use: they dominate cold-start time
+# for workers and batch runs that never call the model
+from llm_cache import ResponseCache, schema_fingerprint
+from schema_context import SchemaContext, estimate_tokens
+from rate_limit import TokenBucket, SingleFlight, parse_retry_after, backoff_delay
+from telemetry import TELEMETRY, get_logger
+
+# Bump a template's version whenever its prompt changes so stale cached answers are not reused
+PROMPT_VERSIONS = {
+    "validation_policy": 1,
+    "project_overview": 1,
+    "full_documentation": 1,
+    "outlier_reasoning": 1,
+}
+
+# Schema parts each template's prompt shows; only these feed its cache key
+PROMPT_INPUTS = {
+    "validation_policy": {"column_fields": ("type",)},
+    "project_overview": {"total_rows": True},
+    "full_documentation": {"total_rows": True},
+}
 
 class AIService:
+    RETRY_STATUSES = (429, 500, 503)
+
     def __init__(self):
         self.log_file = "gemini_api.log"
+        # Records are queued here and written (JSON lines, rotated) by a background thread
+        self.logger = get_logger(self.log_file)
         self._last_error = None
+        self.model_name = "gemini-2.5-flash"
+
+        # Persistent response cache keyed by model + prompt version + schema fingerprint
+        cache_path = os.environ.get("INSIGHTDB_LLM_CACHE", os.path.join(os.path.dirname(os.path.abspath(__file__)), "llm_cache.sqlite3"))
+        self.cache = ResponseCache(cache_path)
+
+        # Keep-alive connection pool shared by all calls (created on first use), and a small pool for concurrent requests
+        self.max_concurrency = int(os.environ.get("INSIGHTDB_AI_CONCURRENCY", 4))
+        self._session = None
+        self.executor = ThreadPoolExecutor(max_workers=self.max_concurrency, thread_name_prefix="ai")
+        # Background precompute (outlier explanations) gets its own single thread so it never queues
+        # ahead of the policy/overview/docs calls of the next upload, and only spends spare quota
+        self.background = ThreadPoolExecutor(max_workers=1, thread_name_prefix="ai-bg")
+        self._background_futures = []
+        self._priority = threading.local()
+        self._auth_lock = threading.Lock()
+        self._session_lock = threading.Lock()
+
+        # Quota protection: per-process token bucket, single-flight coalescing and retry/backoff.
+        # INSIGHTDB_AI_RPM/BURST are project-wide; gunicorn.conf.py exports the worker count so each process takes its share
+        processes = max(1, int(os.environ.get("INSIGHTDB_AI_PROCESSES", 1)))
+        burst = os.environ.get("INSIGHTDB_AI_BURST")
+        self.limiter = TokenBucket(
+            float(os.environ.get("INSIGHTDB_AI_RPM", 60)) / processes,
+            burst=max(1, int(burst) // processes) if burst else None
+        )
+        self.limiter_timeout = float(os.environ.get("INSIGHTDB_AI_QUEUE_TIMEOUT", 120))
+        self.max_retries = int(os.environ.get("INSIGHTDB_AI_MAX_RETRIES", 3))
+        self.single_flight = SingleFlight()
+        # How long other workers wait on this one's claim before generating the answer themselves
+        self.claim_lease = float(os.environ.get("INSIGHTDB_AI_CLAIM_LEASE", 300))
+        self._stats = {"retries": 0, "throttled": 0, "coalesced_across_workers": 0}
+        self._stats_lock = threading.Lock()
         
         # Service Account Configuration
         self.sa_key_name = "insightdb-488114-05559aae354e.json"
         self.credentials = None
         self.project_id = "insightdb-488114"
         self.location = "us-central1"
+
+        # Override to point at a local mock (see mock_vertex.py); credentials become optional then
+        self.api_base = os.environ.get("INSIGHTDB_VERTEX_BASE_URL", f"https://{self.location}-aiplatform.googleapis.com").rstrip("/")
+        self._use_mock = "INSIGHTDB_VERTEX_BASE_URL" in os.environ
         
-        # Determine absolute path for the service account key
-        sa_path = None
-        possible_paths = [
-            os.path.join(os.getcwd(), self.sa_key_name),
-            os.path.join(os.path.dirname(__file__), self.sa_key_name),
-            os.path.join(os.path.dirname(os.path.dirname(__file__)), self.sa_key_name),
-            f"C:\\Users\\acer\\Desktop\\hackfest-2.0\\{self.sa_key_name}"
-        ]
-        
-        for p in possible_paths:
-            if os.path.exists(p):
-                sa_path = p
-                self._log(f"Found Service Account key at: {p}")
-                break
-        
-        if sa_path:
+        # The key is looked up and loaded on the first authenticated call, not at construction
+        self._credentials_loaded = False
+
+    @property
+    def session(self):
+        if self._session is None:
+            with self._session_lock:
+                if self._session is None:
+                    import requests
+                    from requests.adapters import HTTPAdapter
+                    session = requests.Session()
+                    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.max_concurrency)
+                    session.mount("https://", adapter)
+                    session.mount("http://", adapter)
+                    self._session = session
+        return self._session
+
+    def _load_credentials(self):
+        """Finds and loads the service account key once, on first use."""
+        with self._auth_lock:
+            if self._credentials_loaded:
+                return
+            self._credentials_loaded = True
+
+            # Determine absolute path for the service account key
+            sa_path = None
+            possible_paths = [
+                os.environ.get("INSIGHTDB_SA_KEY_PATH"),
+                os.path.join(os.getcwd(), self.sa_key_name),
+                os.path.join(os.path.dirname(__file__), self.sa_key_name),
+                os.path.join(os.path.dirname(os.path.dirname(__file__)), self.sa_key_name)
+            ]
+
+            for p in possible_paths:
+                if p and os.path.exists(p):
+                    sa_path = p
+                    self._log(f"Found Service Account key at: {p}")
+                    break
+
+            if sa_path:
+                try:
+                    from google.oauth2 import service_account
+                    # Strictly use 'https://www.googleapis.com/auth/cloud-platform' scope as requested
+                    self.credentials = service_account.Credentials.from_service_account_file(
+                        sa_path,
+                        scopes=['https://www.googleapis.com/auth/cloud-platform']
+                    )
+                    self.project_id = self.credentials.project_id
+                    self._log(f"Service Account Loaded. Project: {self.project_id}")
+                except Exception as e:
+                    self._log(f"Service Account Auth Error: {e}")
+                    self._last_error = f"Auth Init Error: {e}"
+            else:
+                self._log("CRITICAL: Service Account JSON not found.")
+                self._last_error = "Service Account JSON not found."
+
+    def submit(self, fn, *args, **kwargs):
+        """Runs an AIService call on the shared pool and returns its Future."""
+        return self.executor.submit(fn, *args, **kwargs)
+
+    def submit_background(self, fn, *args, **kwargs):
+        """Runs a low-priority job on the background thread; its calls only take spare rate-limit tokens."""
+        def run():
+            self._priority.low = True
             try:
-                # Strictly use 'https://www.googleapis.com/auth/cloud-platform' scope as requested
-                self.credentials = service_account.Credentials.from_service_account_file(
-                    sa_path,
-                    scopes=['https://www.googleapis.com/auth/cloud-platform']
-                )
-                self.project_id = self.credentials.project_id
-                self._log(f"Service Account Loaded. Project: {self.project_id}")
-            except Exception as e:
-                self._log(f"Service Account Auth Error: {e}")
-                self._last_error = f"Auth Init Error: {e}"
-        else:
-            self._log("CRITICAL: Service Account JSON not found.")
-            self._last_error = "Service Account JSON not found."
+                return fn(*args, **kwargs)
+            finally:
+                self._priority.low = False
+        future = self.background.submit(run)
+        self._background_futures = [f for f in self._background_futures if not f.done()] + [future]
+        return future
+
+    def cancel_background(self):
+        """Cancels background jobs that have not started yet (e.g. the previous upload's precompute)."""
+        for future in self._background_futures:
+            future.cancel()
+        self._background_futures = []
+
+    def close(self):
+        """Cancels queued AI jobs (outlier precompute, docs) and releases the pools and connections."""
+        self.executor.shutdown(wait=False, cancel_futures=True)
+        self.background.shutdown(wait=False, cancel_futures=True)
+        if self._session is not None:
+            self._session.close()
 
-    def _log(self, message):
-        with open(self.log_file, "a") as f:
-            f.write(f"[{datetime.datetime.now()}] {message}\n")
+    def _log(self, message, **fields):
+        self.logger.info(message, extra={"fields": fields})
+
+    def _record_call(self, operation, status, started=None, meta=None, cache_hit=False, **fields):
+        """Feeds one AI call (or cache hit) into the telemetry aggregates and the structured log."""
+        meta = meta or {}
+        latency_ms = round((time.monotonic() - started) * 1000, 1) if started is not None else None
+        prompt_tokens = meta.get("promptTokenCount")
+        response_tokens = meta.get("candidatesTokenCount")
+        TELEMETRY.record(operation, status, latency_ms, prompt_tokens, response_tokens, cache_hit)
+        self._log("ai_call", event="ai_call", model=self.model_name, operation=operation, status=status,
+                  latency_ms=latency_ms, prompt_tokens=prompt_tokens, response_tokens=response_tokens,
+                  cache_hit=cache_hit, **fields)
 
     def _get_auth_headers(self):
         """Generates headers strictly using Service Account OAuth2 token."""
+        self._load_credentials()
         if not self.credentials:
+            if self._use_mock:
+                return {"Content-Type": "application/json"}
             self._log("No credentials available for OAuth2.")
             return None
 
         try:
-            if not self.credentials.valid:
-                self._log("Refreshing OAuth2 token...")
-                auth_request = google.auth.transport.requests.Request()
-                self.credentials.refresh(auth_request)
+            # Concurrent calls must not refresh the token more than once
+            with self._auth_lock:
+                if not self.credentials.valid:
+                    import google.auth.transport.requests
+                    self._log("Refreshing OAuth2 token...")
+                    auth_request = google.auth.transport.requests.Request(session=self.session)
+                    self.credentials.refresh(auth_request)
+                token = self.credentials.token
             
             # Attach it as Authorization: Bearer <token>
             return {
                 "Content-Type": "application/json",
-                "Authorization": f"Bearer {self.credentials.token}"
+                "Authorization": f"Bearer {token}"
             }
         except Exception as e:
             err = f"Token Refresh Error: {e}"
@@ -74,17 +207,67 @@ class AIService:
             self._last_error = err
             return None
 
-    def _call_gemini_rest(self, prompt, is_json=False):
-        """Strict Vertex AI REST caller using Service Account OAuth2."""
+    def _cache_key(self, template, schemas):
+        return self.cache.make_key(self.model_name, template, PROMPT_VERSIONS[template], schema_fingerprint(schemas, **PROMPT_INPUTS[template]))
+
+    def _call_gemini_json(self, prompt, cache_key, label, operation="generate"):
+        """Calls the model for a JSON answer, serving and storing parsed results via the response cache."""
+        cached = self.cache.get(cache_key)
+        if cached is not None:
+            self._record_call(operation, "cache", cache_hit=True)
+            return cached
+
+        # Coalesce across worker processes: if another worker is already generating this
+        # answer (e.g. docs for a snapshot this worker adopted), wait for it in the shared cache
+        owner = self.cache.claim(cache_key, self.claim_lease)
+        if owner is None:
+            result = self.cache.wait_for(cache_key, timeout=self.claim_lease)
+            if result is not None:
+                self._bump_stat("coalesced_across_workers")
+                self._record_call(operation, "coalesced", cache_hit=True)
+                return result
+            # The other worker failed; try ourselves
+            owner = self.cache.claim(cache_key, self.claim_lease)
+
+        try:
+            text = self._call_gemini_rest(prompt, is_json=True, operation=operation)
+            if text:
+                try:
+                    clean_text = text.replace("```json", "").replace("```", "").strip()
+                    result = json.loads(clean_text)
+                    self.cache.set(cache_key, result)
+                    return result
+                except Exception as e:
+                    self._log(f"{label} Parse Error: {e}")
+            return None
+        finally:
+            if owner is not None:
+                self.cache.release(cache_key, owner)
+
+    def _call_gemini_rest(self, prompt, is_json=False, usage=None, operation="generate"):
+        """Strict Vertex AI REST caller using Service Account OAuth2.
+
+        Identical concurrent prompts share one upstream call, every call waits for the
+        client-side rate limiter, and 429/503 responses are retried with backoff.
+        If a ``usage`` dict is given it is filled with the token counts reported by the API.
+        """
         headers = self._get_auth_headers()
         if not headers: 
             return None
-        
-        model_name = "gemini-2.5-flash"
-        
+
+        flight_key = hashlib.sha256(f"{self.model_name}|{is_json}|{prompt}".encode("utf-8")).hexdigest()
+        text, meta = self.single_flight.do(flight_key, lambda: self._post_generate(prompt, is_json, headers, operation))
+        if usage is not None and meta:
+            usage["prompt_tokens"] = meta.get("promptTokenCount")
+            usage["response_tokens"] = meta.get("candidatesTokenCount")
+            usage["total_tokens"] = meta.get("totalTokenCount")
+        return text
+
+    def _model_url(self, method):
         # Vertex AI Endpoint
-        url = f"https://{self.location}-aiplatform.googleapis.com/v1/projects/{self.project_id}/locations/{self.location}/publishers/google/models/{model_name}:generateContent"
+        return f"{self.api_base}/v1/projects/{self.project_id}/locations/{self.location}/publishers/google/models/{self.model_name}:{method}"
 
+    def _generation_payload(self, prompt, is_json):
         gen_config = {
             "temperature": 0.3,
             "maxOutputTokens": 4096,
@@ -92,39 +275,191 @@ class AIService:
         if is_json:
             gen_config["responseMimeType"] = "application/json"
 
-        payload = {
+        return {
             "contents": [{"role": "user", "parts": [{"text": prompt}]}],
             "generationConfig": gen_config
         }
 
-        try:
-            self._log("Calling AI core via Vertex AI OAuth2...")
-            response = requests.post(url, headers=headers, json=payload, timeout=30)
-            
-            if response.status_code == 200:
-                result = response.json()
-                self._log("Success")
-                return result['candidates'][0]['content']['parts'][0]['text']
-            else:
+    def _stream_gemini_rest(self, prompt, usage=None):
+        """Streams text chunks from streamGenerateContent (SSE).
+
+        Retries (with the same limiter/backoff as _call_gemini_rest) only happen before
+        the first chunk. ``usage`` receives token counts, ttft_ms and latency_ms.
+        """
+        headers = self._get_auth_headers()
+        if not headers:
+            return
+        if usage is None:
+            usage = {}
+
+        import requests
+        url = self._model_url("streamGenerateContent") + "?alt=sse"
+        payload = self._generation_payload(prompt, False)
+        started = time.monotonic()
+
+        for attempt in range(self.max_retries + 1):
+            if not self.limiter.acquire(timeout=self.limiter_timeout):
+                self._last_error = "Client-side rate limit: request queue timed out."
+                self._log(self._last_error)
+                return
+
+            retry_after = None
+            attempt_started = time.monotonic()
+            try:
+                self._log("Streaming from AI core via Vertex AI OAuth2...")
+                response = self.session.post(url, headers=headers, json=payload, timeout=30, stream=True)
+            except requests.RequestException as e:
+                self._last_error = f"Request Exception: {e}"
+                self._record_call("chat_stream", "exception", attempt_started, attempt=attempt, error=str(e))
+                response = None
+
+            if response is not None and response.status_code == 200:
+                response.encoding = "utf-8"
+                status = 200
+                meta = {}
+                try:
+                    for line in response.iter_lines(chunk_size=None, decode_unicode=True):
+                        if not line or not line.startswith("data:"):
+                            continue
+                        chunk = json.loads(line[5:])
+                        if chunk.get("usageMetadata"):
+                            meta = chunk["usageMetadata"]
+                            usage["prompt_tokens"] = meta.get("promptTokenCount")
+                            usage["response_tokens"] = meta.get("candidatesTokenCount")
+                            usage["total_tokens"] = meta.get("totalTokenCount")
+                        for candidate in chunk.get("candidates", [])[:1]:
+                            for part in candidate.get("content", {}).get("parts", []):
+                                if part.get("text"):
+                                    if "ttft_ms" not in usage:
+                                        usage["ttft_ms"] = round((time.monotonic() - started) * 1000, 1)
+                                    yield part["text"]
+                    return
+                except GeneratorExit:
+                    status = "cancelled"
+                    raise
+                except Exception as e:
+                    status = "exception"
+                    self._last_error = f"Stream Exception: {e}"
+                    self._log(self._last_error)
+                    return
+                finally:
+                    # Also runs when the caller closes us early, which drops the upstream connection
+                    response.close()
+                    usage["latency_ms"] = round((time.monotonic() - started) * 1000, 1)
+                    self._record_call("chat_stream", status, attempt_started, meta, attempt=attempt, ttft_ms=usage.get("ttft_ms"))
+
+            if response is not None:
+                self._record_call("chat_stream", response.status_code, attempt_started, attempt=attempt)
+                self._last_error = f"AI Error {response.status_code}: {response.text}"
+                self._log(self._last_error)
+                if response.status_code not in self.RETRY_STATUSES:
+                    return
+                retry_after = parse_retry_after(response)
+                if response.status_code == 429:
+                    self._bump_stat("throttled")
+                    self._last_error = "Quota Exceeded on Vertex AI (429)."
+                    self.limiter.penalize(retry_after or 0)
+
+            if attempt < self.max_retries:
+                delay = backoff_delay(attempt, retry_after)
+                self._bump_stat("retries")
+                self._log(f"Retrying stream in {delay:.1f}s (attempt {attempt + 1}/{self.max_retries})")
+                time.sleep(delay)
+
+    def _post_generate(self, prompt, is_json, headers, operation):
+        """Performs the generateContent request; returns (text, usageMetadata) or (None, None)."""
+        import requests
+        url = self._model_url("generateContent")
+        payload = self._generation_payload(prompt, is_json)
+
+        low_priority = getattr(self._priority, "low", False)
+        for attempt in range(self.max_retries + 1):
+            if not self.limiter.acquire(timeout=self.limiter_timeout, low_priority=low_priority):
+                self._last_error = "Client-side rate limit: request queue timed out."
+                self._log(self._last_error)
+                return None, None
+
+            retry_after = None
+            started = time.monotonic()
+            try:
+                self._log("Calling AI core via Vertex AI OAuth2...")
+                response = self.session.post(url, headers=headers, json=payload, timeout=30)
+                
+                if response.status_code == 200:
+                    result = response.json()
+                    meta = result.get("usageMetadata", {})
+                    self._record_call(operation, 200, started, meta, attempt=attempt)
+                    return result['candidates'][0]['content']['parts'][0]['text'], meta
+
+                self._record_call(operation, response.status_code, started, attempt=attempt)
                 err_msg = f"AI Error {response.status_code}: {response.text}"
                 self._last_error = err_msg
                 self._log(err_msg)
                 
                 if "API_KEY_SERVICE_BLOCKED" in response.text:
                     self._last_error = "Vertex AI API blocked. Ensure API is enabled and billing is active."
-                elif "429" in response.text:
-                    self._last_error = "Quota Exceeded on Vertex AI."
-                    
-        except Exception as e:
-            self._last_error = f"Request Exception: {e}"
-            self._log(self._last_error)
+                    return None, None
+                if response.status_code not in self.RETRY_STATUSES:
+                    return None, None
+
+                retry_after = parse_retry_after(response)
+                if response.status_code == 429:
+                    self._bump_stat("throttled")
+                    self._last_error = "Quota Exceeded on Vertex AI (429)."
+                    # Hold back every other caller in this process too
+                    self.limiter.penalize(retry_after or 0)
+                        
+            except requests.RequestException as e:
+                self._last_error = f"Request Exception: {e}"
+                self._record_call(operation, "exception", started, attempt=attempt, error=str(e))
+            except Exception as e:
+                self._last_error = f"Request Exception: {e}"
+                self._record_call(operation, "exception", started, attempt=attempt, error=str(e))
+                return None, None
+
+            if attempt < self.max_retries:
+                delay = backoff_delay(attempt, retry_after)
+                self._bump_stat("retries")
+                self._log(f"Retrying in {delay:.1f}s (attempt {attempt + 1}/{self.max_retries})")
+                time.sleep(delay)
         
-        return None
+        return None, None
+
+    def _bump_stat(self, name):
+        with self._stats_lock:
+            self._stats[name] += 1
+
+    def limiter_stats(self):
+        """Queue depth and retry/coalescing counters for the upstream AI calls."""
+        with self._stats_lock:
+            stats = dict(self._stats)
+        stats.update({
+            "queue_depth": self.limiter.waiting,
+            "in_flight": self.single_flight.in_flight(),
+            "coalesced": self.single_flight.coalesced,
+            "rate_per_minute": round(self.limiter.rate * 60, 2),
+            "burst": self.limiter.capacity
+        })
+        return stats
+
+    def chat(self, question, context, usage=None):
+        """Answers a user question based on the provided context (collects the streamed answer)."""
+        return "".join(self.chat_stream(question, context, usage=usage))
+
+    def chat_stream(self, question, context, usage=None):
+        """Yields the answer to a user question as text chunks, as the model produces them.
 
-    def chat(self, question, context):
-        """Answers a user question based on the provided context."""
+        Only the schema tables/columns relevant to the question are embedded, within
+        ``context['context_budget']`` estimated tokens. Token counts and time-to-first-token
+        are written to ``usage``. Closing the generator cancels the upstream request.
+        """
         overview = context.get('overview', {})
-        schema = context.get('schema', {})
+        schema_context = context.get('schema_context') or SchemaContext(context.get('schema', {}), context.get('trust_scores'))
+        budget = int(context.get('context_budget') or os.environ.get("INSIGHTDB_CHAT_CONTEXT_TOKENS", 2000))
+        schema_text, selection = schema_context.select(question, budget)
+        if usage is None:
+            usage = {}
+        usage.update(selection)
         
         prompt = f"""
         You are the InsightDB AI Assistant. Your goal is to help the user understand their data.
@@ -134,8 +469,8 @@ class AIService:
         Description: {overview.get('description', 'Analyzing relational datasets.')}
         Key Entities: {', '.join(overview.get('key_entities', []))}
         
-        DATA ARCHITECTURE:
-        Tables and Columns: {json.dumps(schema, indent=2)}
+        DATA ARCHITECTURE (most relevant tables; format: table (rows, trust, pk, fk): column:kind, ...):
+        {schema_text}
         
         USER QUESTION: "{question}"
         
@@ -148,15 +483,20 @@ class AIService:
         - Cite metrics or column names if relevant to the question.
         - If the question is about data you don't have, say so politely.
         """
-        text = self._call_gemini_rest(prompt, is_json=False)
-        if text:
-            return text
+        usage["estimated_prompt_tokens"] = estimate_tokens(prompt)
+        produced = False
+        for text in self._stream_gemini_rest(prompt, usage=usage):
+            produced = True
+            yield text
+        if produced:
+            return
         
         # If we failed, check if it was a quota issue
         if self._last_error and "429" in self._last_error:
-            return "AI core is currently rate-limited (Quota Exceeded). Please wait 60 seconds and try again."
+            yield "AI core is currently rate-limited (Quota Exceeded). Please wait 60 seconds and try again."
+            return
         
-        return f"I'm having trouble connecting to my AI core right now. (Status: {self._last_error[:100] if self._last_error else 'Unknown'})"
+        yield f"I'm having trouble connecting to my AI core right now. (Status: {self._last_error[:100] if self._last_error else 'Unknown'})"
 
     def generate_project_overview(self, schemas):
         """Generates a dynamic project background with rich business context."""
@@ -193,15 +533,8 @@ class AIService:
         Be smart and specific based on column names. Avoid vague phrases. Ensure the response is valid JSON.
         """
 
-        text = self._call_gemini_rest(prompt, is_json=True)
-        if text:
-            try:
-                clean_text = text.replace("```json", "").replace("```", "").strip()
-                return json.loads(clean_text)
-            except Exception as e:
-                self._log(f"Project Overview Parse Error: {e}")
-        
-        return fallback
+        result = self._call_gemini_json(prompt, self._cache_key("project_overview", schemas), "Project Overview", operation="project_overview")
+        return result if result is not None else fallback
 
     def generate_full_documentation(self, schemas):
         """Generates a comprehensive long-form documentation report."""
@@ -234,13 +567,9 @@ class AIService:
         - Ensure the response is valid JSON.
         """
 
-        text = self._call_gemini_rest(prompt, is_json=True)
-        if text:
-            try:
-                clean_text = text.replace("```json", "").replace("```", "").strip()
-                return json.loads(clean_text)
-            except Exception as e:
-                self._log(f"Full Documentation Parse Error: {e}")
+        result = self._call_gemini_json(prompt, self._cache_key("full_documentation", schemas), "Full Documentation", operation="full_documentation")
+        if result is not None:
+            return result
         
         # Minimal Fallback
         return {
@@ -286,26 +615,92 @@ class AIService:
         Be smart. If a column name implies a count or price, it is UNSIGNED.
         """
 
-        text = self._call_gemini_rest(prompt, is_json=True)
-        if text:
-            try:
-                clean_text = text.replace("```json", "").replace("```", "").strip()
-                return json.loads(clean_text)
-            except Exception as e:
-                self._log(f"Validation Policy Parse Error: {e}")
-        
-        return {}
+        result = self._call_gemini_json(prompt, self._cache_key("validation_policy", schemas), "Validation Policy", operation="validation_policy")
+        return result if result is not None else {}
+
+    def _outlier_cache_key(self, table_name, column_name, row_data):
+        # Keyed by the full row contents, so an edited row never reuses an old explanation
+        row_hash = hashlib.sha256(json.dumps(row_data, sort_keys=True, default=str).encode("utf-8")).hexdigest()
+        return self.cache.make_key(self.model_name, "outlier_reasoning", PROMPT_VERSIONS["outlier_reasoning"], row_hash, extra=[table_name, column_name])
 
     def reason_outliers(self, table_name, column_name, row_data, value):
         """Provides AI reasoning for a specific outlier value."""
+        cache_key = self._outlier_cache_key(table_name, column_name, row_data)
+        cached = self.cache.get(cache_key)
+        if cached is not None:
+            self._record_call("outlier_reasoning", "cache", cache_hit=True)
+            return cached
+
         prompt = f"""
         Explain why this value might be an outlier or if it might be valid based on context.
         Table: {table_name}
         Column: {column_name}
         Value: {value}
-        Row Context: {json.dumps(row_data, indent=2)}
+        Row Context: {json.dumps(row_data, default=str)}
 
         Provide a 1-sentence logical explanation.
         """
-        text = self._call_gemini_rest(prompt, is_json=False)
-        return text if text else "Outlier detected via statistical Z-score."
+        text = self._call_gemini_rest(prompt, is_json=False, operation="outlier_reasoning")
+        if text:
+            self.cache.set(cache_key, text)
+            return text
+        return "Outlier detected via statistical Z-score."
+
+    def explain_outliers_batch(self, table_name, items, column_context, group_size=25):
+        """Explains many outliers of one table in a few grouped prompts.
+
+        :param items: [{"column", "row_index", "value", "z", "row", "related"}] where ``row`` is the
+            full row (used only for the cache key) and ``related`` holds the correlated columns' values
+        :param column_context: {column: {"percentiles": {...}, "correlated": [...]}} from QualityEngine.outliers
+        :return: [{"column", "row_index", "reason", "cached"}]
+        """
+        results = []
+        pending = []
+        for item in items:
+            cache_key = self._outlier_cache_key(table_name, item["column"], item["row"])
+            cached = self.cache.get(cache_key)
+            if cached is not None:
+                self._record_call("outlier_batch", "cache", cache_hit=True)
+                results.append({"column": item["column"], "row_index": item["row_index"], "reason": cached, "cached": True})
+            else:
+                pending.append((cache_key, item))
+
+        for start in range(0, len(pending), group_size):
+            group = pending[start:start + group_size]
+            columns = sorted({item["column"] for _, item in group})
+            rows = [
+                {"id": i, "column": item["column"], "value": item["value"], "z": item["z"], "related": item["related"]}
+                for i, (_, item) in enumerate(group)
+            ]
+            context = {c: {k: column_context.get(c, {}).get(k) for k in ("percentiles", "correlated")} for c in columns}
+
+            prompt = f"""
+            You are a data quality analyst. Each row below is a statistical outlier (|z| > 3) in table "{table_name}".
+            For each one, explain in 1 sentence why the value is extreme or why it may still be valid,
+            using the column percentiles and the values of correlated columns in the same row.
+
+            Column context: {json.dumps(context, separators=(",", ":"), default=str)}
+            Outliers: {json.dumps(rows, separators=(",", ":"), default=str)}
+
+            Output ONLY valid JSON: {{"explanations": [{{"id": 0, "reason": "..."}}]}}
+            """
+            text = self._call_gemini_rest(prompt, is_json=True, operation="outlier_batch")
+            reasons = {}
+            if text:
+                try:
+                    clean_text = text.replace("```json", "").replace("```", "").strip()
+                    reasons = {int(e["id"]): e["reason"] for e in json.loads(clean_text).get("explanations", [])}
+                except Exception as e:
+                    self._log(f"Outlier Batch Parse Error: {e}")
+
+            for i, (cache_key, item) in enumerate(group):
+                reason = reasons.get(i)
+                if reason:
+                    self.cache.set(cache_key, reason)
+                results.append({
+                    "column": item["column"],
+                    "row_index": item["row_index"],
+                    "reason": reason or "Outlier detected via statistical Z-score.",
+                    "cached": False
+                })
+        return results
@@ -1,11 +1,15 @@
-from flask import Flask, jsonify, request, send_from_directory
+from flask import Flask, Response, jsonify, request, send_from_directory
 from flask_cors import CORS
 from data_loader import DataLoader
-from schema_analyzer import SchemaAnalyzer
-from quality_engine import QualityEngine
 from ai_service import AIService
+from snapshot_store import SnapshotStore
+from schema_context import SchemaContext
+from telemetry import TELEMETRY
+from pipeline import Pipeline
+from relationship_graph import build_relationship_graph
 import os
 import json
+import threading
 
 app = Flask(__name__, static_folder='../frontend', static_url_path='')
 CORS(app)
@@ -16,13 +20,134 @@ UPLOAD_FOLDER = os.path.join(BASE_DIR, 'uploads')
 if not os.path.exists(UPLOAD_FOLDER):
     os.makedirs(UPLOAD_FOLDER)
 
+# Published, read-only snapshots shared by every worker process (see gunicorn.conf.py)
+SNAPSHOT_DIR = os.environ.get('INSIGHTDB_SNAPSHOT_DIR', os.path.join(BASE_DIR, 'snapshots'))
+
 data_loader = DataLoader() # Assuming data is in ../data or defined in loader
+snapshot_store = SnapshotStore(SNAPSHOT_DIR)
+loaded_version = None
 schema_analyzer = None
 quality_engine = None
+query_engine = None
+schema_context = None # Chat retrieval index, rebuilt per workspace version
+relationship_graph = {} # Table/FK graph built from the quality pass, published with each version
 ai_service = None
 project_overview = {}
 full_documentation = {}
 validation_policy = {}
+policy_source = None # "local" until the AI policy has been merged in, then "local+ai"
+documentation_future = None # Background full-docs generation started by _perform_init
+publish_lock = threading.Lock()
+pipeline = Pipeline() # Memoized analysis nodes, reused across uploads/appends and policy refinements
+
+def _snapshot_artifacts():
+    return {
+        "schema": schema_analyzer.schema,
+        "metrics": quality_engine.metrics,
+        "outliers": quality_engine.outliers,
+        "distributions": quality_engine.distributions,
+        "relationship_graph": relationship_graph,
+        "validation_policy": validation_policy,
+        "policy_source": policy_source,
+        "project_overview": project_overview,
+        "full_documentation": full_documentation
+    }
+
+def _publish_snapshot():
+    """Publishes the current in-process analysis so other workers can serve it."""
+    global loaded_version
+    with publish_lock:
+        loaded_version = snapshot_store.publish(data_loader.tables, _snapshot_artifacts())
+        if query_engine is not None:
+            # Cursors carry the tables' version so other workers accept them and re-uploads reject them
+            query_engine.version = loaded_version
+
+def _publish_artifacts():
+    """Republishes refined artifacts over the tables this worker published.
+
+    Dropped if another worker has published a newer upload meanwhile; this worker adopts that one on its next request.
+    """
+    global loaded_version
+    with publish_lock:
+        loaded_version = snapshot_store.publish_artifacts(_snapshot_artifacts(), base_version=loaded_version) or loaded_version
+
+def _set_full_documentation(docs, future=None):
+    """Stores generated docs once and republishes; stale background results are dropped."""
+    global full_documentation, loaded_version
+    with publish_lock:
+        if future is not None and future is not documentation_future:
+            return
+        if full_documentation:
+            return
+        full_documentation = docs
+        if loaded_version:
+            loaded_version = snapshot_store.publish_artifacts({"full_documentation": full_documentation}, base_version=loaded_version) or loaded_version
+
+def _build_schema_context():
+    trust_scores = {k: v['trust_score'] for k, v in quality_engine.metrics.items()}
+    return SchemaContext(schema_analyzer.schema, trust_scores)
+
+def _build_relationship_graph():
+    return build_relationship_graph(schema_analyzer.schema, quality_engine.metrics, quality_engine.relationships)
+
+def _clear_state():
+    global schema_analyzer, quality_engine, query_engine, schema_context, relationship_graph, project_overview, full_documentation, validation_policy, policy_source, documentation_future, pipeline
+    pipeline = Pipeline()
+    relationship_graph = {}
+    documentation_future = None
+    policy_source = None
+    schema_analyzer = None
+    quality_engine = None
+    query_engine = None
+    schema_context = None
+    project_overview = {}
+    full_documentation = {}
+    validation_policy = {}
+    data_loader.tables = {}
+
+@app.before_request
+def _sync_snapshot():
+    """Adopts the latest published snapshot if another worker has published a newer one."""
+    global loaded_version, schema_analyzer, quality_engine, query_engine, schema_context, relationship_graph, ai_service, project_overview, full_documentation, validation_policy, policy_source, documentation_future
+    if not request.path.startswith('/api/'):
+        return
+    version = snapshot_store.current_version()
+    if version is None or version == loaded_version:
+        return
+
+    if version == "":
+        # Another worker handled /api/reset: drop our queued AI jobs (precompute, docs) as well
+        _clear_state()
+        if ai_service is not None:
+            ai_service.close()
+        ai_service = None
+        loaded_version = version
+        return
+
+    # The pandas-based analysis modules are imported on first use to keep worker cold starts fast
+    from schema_analyzer import SchemaAnalyzer
+    from quality_engine import QualityEngine
+    from query_engine import QueryEngine
+
+    tables, artifacts = snapshot_store.load(version)
+    data_loader.tables = tables
+    schema_analyzer = SchemaAnalyzer(tables)
+    schema_analyzer.schema = artifacts["schema"]
+    validation_policy = artifacts["validation_policy"]
+    policy_source = artifacts.get("policy_source")
+    quality_engine = QualityEngine(tables, schema_analyzer.schema, validation_policy=validation_policy)
+    quality_engine.metrics = artifacts["metrics"]
+    quality_engine.outliers = artifacts.get("outliers", {})
+    quality_engine.distributions = artifacts.get("distributions", {})
+    query_engine = QueryEngine(tables, version=tables.tables_version)
+    schema_context = _build_schema_context()
+    relationship_graph = artifacts.get("relationship_graph", {})
+    project_overview = artifacts["project_overview"]
+    full_documentation = artifacts["full_documentation"]
+    documentation_future = None
+    if ai_service is None:
+        ai_service = AIService()
+    loaded_version = version
 
 @app.route('/')
 def serve_frontend():
@@ -34,39 +159,106 @@ def serve_static(path):
 
 def _perform_init(data_dir=None, reset=True):
     """Internal helper to load data and run analysis without specific request context."""
-    global schema_analyzer, quality_engine, ai_service, project_overview, full_documentation, validation_policy
+    global schema_analyzer, quality_engine, query_engine, schema_context, relationship_graph, ai_service, project_overview, full_documentation, validation_policy, policy_source, documentation_future
     
     # ALWAYS clear full documentation and overview when new data is added
     project_overview = {}
     full_documentation = {}
     validation_policy = {}
+    documentation_future = None
     
     tables = data_loader.load_data(data_dir=data_dir, reset=reset)
     if not tables:
         return False
-        
-    schema_analyzer = SchemaAnalyzer(tables)
+
+    from schema_analyzer import SchemaAnalyzer
+    from quality_engine import QualityEngine
+    from query_engine import QueryEngine
+    from policy_inference import PolicyInferencer, merge_policies
+
+    # Only nodes whose content-hash inputs changed are recomputed (see /api/debug/pipeline)
+    pipeline.begin_run("init" if reset else "append")
+    pipeline.retain_tables(tables.keys())
+    pipeline.forget_frames(tables.values())
+    schema_analyzer = SchemaAnalyzer(tables, pipeline=pipeline)
     schema = schema_analyzer.analyze()
+    query_engine = QueryEngine(tables)
     
     if ai_service is None:
         ai_service = AIService()
+    else:
+        # Explanations queued for the previous data would only delay and spend quota
+        ai_service.cancel_background()
         
-    # Strategy 1: AI-Driven Dynamic Audit Rules
-    print("Generating AI validation policy...")
-    validation_policy = ai_service.generate_validation_policy(schema)
+    # All AI calls go out concurrently and overlap with the local metric computation
+    print("Generating AI validation policy, project overview and documentation...")
+    policy_future = ai_service.submit(ai_service.generate_validation_policy, schema)
+    overview_future = ai_service.submit(ai_service.generate_project_overview, schema)
+    documentation_future = ai_service.submit(ai_service.generate_full_documentation, schema)
     
-    quality_engine = QualityEngine(tables, schema, validation_policy=validation_policy)
+    # Fast path: a local, data-driven policy gives usable metrics while the AI calls are in flight
+    local_policy = PolicyInferencer(tables, schema, pipeline=pipeline).infer()
+    validation_policy = local_policy
+    policy_source = "local"
+    quality_engine = QualityEngine(tables, schema, validation_policy=validation_policy, pipeline=pipeline)
+    quality_engine.compute_base_metrics()
     quality_engine.compute_metrics()
+    schema_context = _build_schema_context()
+    relationship_graph = _build_relationship_graph()
+    _publish_snapshot()
     
-    print("Generating AI project overview...")
-    project_overview = ai_service.generate_project_overview(schema)
+    # Strategy 1: AI-Driven Dynamic Audit Rules, layered over the local policy (which stays as the fallback)
+    ai_policy = policy_future.result()
+    if ai_policy:
+        validation_policy = merge_policies(local_policy, ai_policy)
+        policy_source = "local+ai"
+        # Only tables whose policy slice changed rerun the policy pass; the base pass over the data is reused
+        pipeline.begin_run("ai_policy")
+        quality_engine.validation_policy = validation_policy
+        quality_engine.compute_metrics()
+        schema_context = _build_schema_context()
+        relationship_graph = _build_relationship_graph()
+    
+    project_overview = overview_future.result()
     if project_overview:
         print(f"Project Overview generated: {project_overview.get('title')}")
     else:
         print("Warning: Project Overview generation returned None. Using empty dict.")
         project_overview = {}
+
+    _publish_artifacts()
+    # Docs are not needed to serve the dashboard; publish them whenever they arrive
+    future = documentation_future
+    future.add_done_callback(lambda f: f.cancelled() or _set_full_documentation(f.result(), future=f))
+
+    # Warm the outlier explanation cache so clicks in the quality view answer instantly (low priority)
+    if os.environ.get('INSIGHTDB_PRECOMPUTE_OUTLIERS', '1') == '1':
+        for table_name in quality_engine.outliers:
+            ai_service.submit_background(_explain_outliers, ai_service, quality_engine, table_name)
     return True
 
+def _outlier_items(engine, table_name, top_k=None):
+    """Builds batch items (compact row context) for the top-K outliers of each numeric column."""
+    df = engine.tables.get(table_name)
+    items = []
+    for col, ctx in engine.outliers.get(table_name, {}).items():
+        related = [c["column"] for c in ctx["correlated"]]
+        for candidate in ctx["rows"][:top_k]:
+            row = df.iloc[candidate["row_index"]].to_dict()
+            items.append({
+                "column": col,
+                "row_index": candidate["row_index"],
+                "value": candidate["value"],
+                "z": candidate["z"],
+                "row": row,
+                "related": {c: row.get(c) for c in related}
+            })
+    return items
+
+def _explain_outliers(service, engine, table_name, top_k=None):
+    items = _outlier_items(engine, table_name, top_k)
+    return service.explain_outliers_batch(table_name, items, engine.outliers.get(table_name, {}))
+
 @app.route('/api/upload', methods=['POST'])
 def upload_files():
     """Handles multiple CSV file uploads and triggers processing."""
@@ -131,13 +323,19 @@ def initialize_route():
 
 @app.route('/api/full-docs', methods=['GET'])
 def get_full_documentation():
-    global full_documentation
     if not schema_analyzer:
         return jsonify({"error": "System not initialized."}), 400
     
     if not full_documentation:
-        print("Generating Full AI Documentation...")
-        full_documentation = ai_service.generate_full_documentation(schema_analyzer.schema)
+        future = documentation_future
+        if future is not None:
+            # Already being generated in the background since init
+            _set_full_documentation(future.result(), future=future)
+        else:
+            # Adopted snapshot: if the publishing worker is still generating, this waits for its answer
+            # in the shared response cache instead of paying for a second generation
+            print("Generating Full AI Documentation...")
+            _set_full_documentation(ai_service.generate_full_documentation(schema_analyzer.schema))
         
     return jsonify(full_documentation)
 
@@ -151,13 +349,15 @@ def get_dashboard_metrics():
         return jsonify({"avg_trust_score": 0, "total_tables": 0, "total_rows": 0})
         
     avg_score = sum(m['trust_score'] for m in metrics.values()) / len(metrics)
-    total_rows = sum(len(df) for df in data_loader.tables.values())
+    # Row counts come from the schema so snapshot-backed workers don't materialize every table
+    total_rows = sum(s.get("row_count", 0) for s in schema_analyzer.schema.values())
     
     return jsonify({
         "avg_trust_score": round(avg_score, 2),
         "total_tables": len(data_loader.tables),
         "total_rows": total_rows,
-        "project_info": project_overview
+        "project_info": project_overview,
+        "policy_source": policy_source
     })
 
 @app.route('/api/schema', methods=['GET'])
@@ -177,6 +377,22 @@ def get_quality(table_name):
         
     return jsonify(metrics)
 
+@app.route('/api/distribution/<table_name>', methods=['GET'])
+@app.route('/api/distribution/<table_name>/<column_name>', methods=['GET'])
+def get_distribution(table_name, column_name=None):
+    """Precomputed histogram / quantiles / top-K / per-day counts; never touches raw rows."""
+    if not quality_engine:
+        return jsonify({"error": "System not initialized."}), 400
+
+    distributions = quality_engine.distributions.get(table_name)
+    if distributions is None:
+        return jsonify({"error": "Table not found."}), 404
+    if column_name is None:
+        return jsonify(distributions)
+    if column_name not in distributions:
+        return jsonify({"error": "No distribution for this column."}), 404
+    return jsonify(distributions[column_name])
+
 @app.route('/api/summary/<table_name>', methods=['GET'])
 def get_table_summary(table_name):
     if not ai_service or not quality_engine:
@@ -212,6 +428,48 @@ def get_outlier_reasoning():
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
+@app.route('/api/query/<table_name>', methods=['POST'])
+def query_table(table_name):
+    """Streams one page of a projection/filter/sort/group-by query as NDJSON."""
+    if not query_engine:
+        return jsonify({"error": "System not initialized."}), 400
+
+    if table_name not in query_engine.tables:
+        return jsonify({"error": "Table not found."}), 404
+
+    spec = request.json or {}
+    try:
+        lines = query_engine.execute(table_name, spec)
+    except (ValueError, TypeError) as e:
+        return jsonify({"error": str(e)}), 400
+
+    return Response(lines, mimetype='application/x-ndjson')
+
+@app.route('/api/outlier-reasoning/batch', methods=['POST'])
+def get_outlier_reasoning_batch():
+    """Explains the top-K outliers per numeric column of one table (or all tables) in grouped prompts."""
+    if not ai_service or not quality_engine:
+        return jsonify({"error": "AI Service not initialized."}), 400
+
+    data = request.json or {}
+    table_name = data.get('table_name')
+    top_k = data.get('top_k')
+    if top_k is not None:
+        try:
+            top_k = int(top_k)
+        except (TypeError, ValueError):
+            top_k = 0
+        if top_k <= 0:
+            return jsonify({"error": "top_k must be a positive integer."}), 400
+    table_names = [table_name] if table_name else list(quality_engine.outliers.keys())
+    if table_name and table_name not in quality_engine.outliers:
+        return jsonify({"error": "Table not found."}), 404
+
+    try:
+        return jsonify({t: _explain_outliers(ai_service, quality_engine, t, top_k) for t in table_names})
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
 @app.route('/api/chat', methods=['POST'])
 def chat():
     data = request.json
@@ -219,31 +477,92 @@ def chat():
     
     if not question:
         return jsonify({"error": "No question provided."}), 400
+
+    context_budget = data.get('context_budget')
+    if context_budget is not None:
+        try:
+            context_budget = int(context_budget)
+        except (TypeError, ValueError):
+            context_budget = 0
+        if context_budget <= 0:
+            return jsonify({"error": "context_budget must be a positive integer (estimated tokens)."}), 400
         
     # Context Construction
     # 'schema' is the key expected by AIService.chat, not 'schemas'
     context = {
         "overview": project_overview, # Include the smart project metadata
         "schema": schema_analyzer.schema if schema_analyzer else {},
-        "trust_scores": {k: v['trust_score'] for k, v in quality_engine.metrics.items()} if quality_engine else {}
+        "trust_scores": {k: v['trust_score'] for k, v in quality_engine.metrics.items()} if quality_engine else {},
+        "schema_context": schema_context, # Prebuilt digest + retrieval index
+        "context_budget": context_budget
     }
     
-    answer = ai_service.chat(question, context)
-    return jsonify({"answer": answer})
+    usage = {}
+    if 'text/event-stream' in request.headers.get('Accept', ''):
+        # Relay tokens as Server-Sent Events while the model is still generating
+        chunks = ai_service.chat_stream(question, context, usage=usage)
+
+        def events():
+            try:
+                for text in chunks:
+                    yield f"event: token\ndata: {json.dumps({'text': text})}\n\n"
+                yield f"event: done\ndata: {json.dumps({'usage': usage})}\n\n"
+            finally:
+                # Runs when the client disconnects too; closing cancels the upstream stream
+                chunks.close()
+
+        return Response(events(), mimetype='text/event-stream', headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+    answer = ai_service.chat(question, context, usage=usage)
+    return jsonify({"answer": answer, "usage": usage})
+
+@app.route('/api/ai/cache-stats', methods=['GET'])
+def get_ai_cache_stats():
+    if not ai_service:
+        return jsonify({"error": "AI Service not initialized."}), 400
+    return jsonify(ai_service.cache.stats())
+
+@app.route('/api/ai/limiter-stats', methods=['GET'])
+def get_ai_limiter_stats():
+    if not ai_service:
+        return jsonify({"error": "AI Service not initialized."}), 400
+    return jsonify(ai_service.limiter_stats())
+
+@app.route('/api/ai/telemetry', methods=['GET'])
+def get_ai_telemetry():
+    """AI call counters, error rates and latency histograms, summed over every worker."""
+    return jsonify(TELEMETRY.snapshot())
+
+@app.route('/metrics', methods=['GET'])
+def get_prometheus_metrics():
+    return Response(TELEMETRY.render_prometheus(), mimetype='text/plain; version=0.0.4')
+
+@app.route('/api/relationship-graph', methods=['GET'])
+def get_relationship_graph():
+    """Tables and FK edges with match rates, cardinality and broken-branch propagation (precomputed per version)."""
+    if not relationship_graph:
+        return jsonify({"error": "System not initialized."}), 400
+    return jsonify(relationship_graph)
+
+@app.route('/api/debug/pipeline', methods=['GET'])
+def get_pipeline_debug():
+    """Per-node recompute log of the last analysis runs in this worker: what reran, why, and how long it took."""
+    return jsonify(pipeline.report())
 
 @app.route('/api/reset', methods=['POST'])
 def reset_session():
     """Clears the current session and uploaded files."""
-    global schema_analyzer, quality_engine, ai_service, project_overview
+    global ai_service, loaded_version
     
     # Clear variables
-    schema_analyzer = None
-    quality_engine = None
+    _clear_state()
+    if ai_service is not None:
+        ai_service.close()
     ai_service = None
-    project_overview = {}
-    full_documentation = {}
-    validation_policy = {}
-    data_loader.tables = {}
+
+    # Tell the other workers to drop their state as well
+    snapshot_store.clear()
+    loaded_version = ""
 
     # Clear uploads folder
     import shutil
@@ -269,4 +588,5 @@ if __name__ == '__main__':
     # except Exception as e:
     #     print(f"Startup load failed (expected if no data): {e}")
         
+    # Development server only. For multi-worker serving run: gunicorn -c gunicorn.conf.py app:app
     app.run(debug=True, port=5000)
@@ -0,0 +1,74 @@
+"""Cold-start benchmark: import time and peak RSS of the entry points, each in a fresh interpreter.
+
+    python bench_startup.py            # 5 runs per target
+    python bench_startup.py --runs 10 --json
+"""
+import os
+import sys
+import json
+import ast
+import argparse
+import statistics
+import subprocess
+
+HEAVY_MODULES = ("pandas", "numpy", "pyarrow", "requests", "google.oauth2", "flask")
+
+TARGETS = {
+    "interpreter": "pass",
+    "import app": "import app",
+    "import cli": "import cli",
+    "AIService()": "from ai_service import AIService; AIService()",
+    "import quality_engine": "import quality_engine",
+}
+
+CHILD = """
+import sys, time
+started = time.perf_counter()
+{stmt}
+elapsed = time.perf_counter() - started
+try:
+    import resource
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / (1024 * 1024 if sys.platform == "darwin" else 1024)
+except ImportError:
+    rss = None  # Windows
+print(repr((elapsed, rss, [m for m in {heavy!r} if m in sys.modules])))
+"""
+
+
+def measure(stmt, runs):
+    backend_dir = os.path.dirname(os.path.abspath(__file__))
+    code = CHILD.format(stmt=stmt, heavy=HEAVY_MODULES)
+    times, rss, loaded = [], [], []
+    for _ in range(runs):
+        out = subprocess.run([sys.executable, "-c", code], cwd=backend_dir, capture_output=True, text=True, check=True)
+        elapsed, peak, loaded = ast.literal_eval(out.stdout.strip().splitlines()[-1])
+        times.append(elapsed * 1000)
+        if peak is not None:
+            rss.append(peak)
+    return {
+        "median_ms": round(statistics.median(times), 1),
+        "min_ms": round(min(times), 1),
+        "peak_rss_mb": round(statistics.median(rss), 1) if rss else None,
+        "heavy_modules_loaded": loaded
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--json", action="store_true", help="Print the results as JSON")
+    args = parser.parse_args()
+
+    results = {name: measure(stmt, args.runs) for name, stmt in TARGETS.items()}
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+
+    print(f"{'target':<24}{'median ms':>10}{'min ms':>10}{'rss MB':>9}  heavy modules loaded")
+    for name, r in results.items():
+        rss = r["peak_rss_mb"] if r["peak_rss_mb"] is not None else "-"
+        print(f"{name:<24}{r['median_ms']:>10}{r['min_ms']:>10}{rss:>9}  {', '.join(r['heavy_modules_loaded']) or '-'}")
+
+
+if __name__ == "__main__":
+    main()
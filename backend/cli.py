@@ -0,0 +1,109 @@
+"""Headless batch entry point: profiles a directory of CSVs to a JSON report without Flask.
+
+    python cli.py profile ../data -o report.json
+    python cli.py profile ../data --ai-policy > report.json
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import datetime
+from contextlib import redirect_stdout
+
+
+def _json_default(obj):
+    # numpy scalars and timestamps leak into metrics; unwrap them for JSON
+    if hasattr(obj, "item"):
+        return obj.item()
+    return str(obj)
+
+
+def profile(data_dir, ai_policy=False):
+    """Runs the same analysis as the server's init and returns the report dict."""
+    from data_loader import DataLoader
+    from schema_analyzer import SchemaAnalyzer
+    from quality_engine import QualityEngine
+    from policy_inference import PolicyInferencer, merge_policies
+    from pipeline import Pipeline
+    from relationship_graph import build_relationship_graph
+
+    timings = {}
+
+    def timed(name, fn):
+        started = time.perf_counter()
+        result = fn()
+        timings[name] = round((time.perf_counter() - started) * 1000, 1)
+        return result
+
+    tables = timed("load", lambda: DataLoader().load_data(data_dir=data_dir))
+    if not tables:
+        return None
+
+    pipeline = Pipeline()
+    pipeline.begin_run("cli")
+    schema = timed("schema", lambda: SchemaAnalyzer(tables, pipeline=pipeline).analyze())
+    validation_policy = timed("local_policy", lambda: PolicyInferencer(tables, schema, pipeline=pipeline).infer())
+    policy_source = "local"
+    quality_engine = QualityEngine(tables, schema, validation_policy=validation_policy, pipeline=pipeline)
+    timed("quality", quality_engine.compute_metrics)
+
+    if ai_policy:
+        from ai_service import AIService
+        policy = timed("ai_policy", lambda: AIService().generate_validation_policy(schema))
+        if policy:
+            validation_policy = merge_policies(validation_policy, policy)
+            policy_source = "local+ai"
+            quality_engine.validation_policy = validation_policy
+            timed("quality_refine", quality_engine.compute_metrics)
+
+    graph = timed("relationship_graph", lambda: build_relationship_graph(schema, quality_engine.metrics, quality_engine.relationships))
+
+    return {
+        "generated_at": datetime.datetime.now().isoformat(),
+        "data_dir": os.path.abspath(data_dir),
+        "policy_source": policy_source,
+        "validation_policy": validation_policy,
+        "tables": {
+            name: {
+                "schema": schema[name],
+                "metrics": quality_engine.metrics[name],
+                "distributions": quality_engine.distributions.get(name, {}),
+                "outliers": quality_engine.outliers.get(name, {})
+            }
+            for name in tables
+        },
+        "relationship_graph": graph,
+        "timings_ms": timings
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="insightdb", description="InsightDB headless batch profiling")
+    commands = parser.add_subparsers(dest="command", required=True)
+    profile_cmd = commands.add_parser("profile", help="Profile a directory of CSV files into a JSON report")
+    profile_cmd.add_argument("data_dir", help="Directory containing the .csv files")
+    profile_cmd.add_argument("-o", "--output", help="Report path (default: stdout)")
+    profile_cmd.add_argument("--ai-policy", action="store_true", help="Layer the Vertex AI validation policy over the local one")
+    profile_cmd.add_argument("--indent", type=int, default=2)
+    args = parser.parse_args(argv)
+
+    # Progress output goes to stderr so stdout stays a clean JSON document
+    with redirect_stdout(sys.stderr):
+        report = profile(args.data_dir, ai_policy=args.ai_policy)
+    if report is None:
+        print(f"No CSV files could be loaded from '{args.data_dir}'.", file=sys.stderr)
+        return 1
+
+    payload = json.dumps(report, indent=args.indent, default=_json_default)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(payload)
+        print(f"Report written to {args.output} ({len(report['tables'])} tables)", file=sys.stderr)
+    else:
+        print(payload)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
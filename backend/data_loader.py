@@ -1,4 +1,3 @@
-import pandas as pd
 import os
 import glob
 
@@ -9,6 +8,7 @@ class DataLoader:
 
     def load_data(self, data_dir=None, reset=True):
         """Loads all CSV files from the data directory into Pandas DataFrames."""
+        import pandas as pd # deferred so importing the app stays cheap until data is loaded
         if data_dir:
             self.data_dir = data_dir
             
@@ -27,6 +27,9 @@ class DataLoader:
         # Reset tables for new load
         if reset:
             self.tables = {}
+        else:
+            # Tables adopted from a published snapshot are a read-only view; append into a plain dict
+            self.tables = dict(self.tables.items())
         
         for file_path in csv_files:
             try:
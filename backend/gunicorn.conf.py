@@ -0,0 +1,17 @@
+# Production serving: gunicorn -c gunicorn.conf.py app:app
+# Every worker maps the same published snapshot (see snapshot_store.py), so adding
+# workers does not multiply DataFrame memory. An upload handled by any worker
+# publishes a new version; the others pick it up on their next API request.
+import multiprocessing
+import os
+import tempfile
+
+bind = os.environ.get("INSIGHTDB_BIND", "0.0.0.0:5000")
+workers = int(os.environ.get("INSIGHTDB_WORKERS", multiprocessing.cpu_count()))
+# Rate limiters are per process: workers inherit this and split INSIGHTDB_AI_RPM between them
+os.environ["INSIGHTDB_AI_PROCESSES"] = str(workers)
+# Workers write their AI telemetry here and /metrics merges it, whichever worker is scraped
+os.environ.setdefault("INSIGHTDB_TELEMETRY_DIR", os.path.join(tempfile.gettempdir(), f"insightdb-telemetry-{os.getpid()}"))
+threads = int(os.environ.get("INSIGHTDB_THREADS", 4))
+# Uploads run the full analysis + AI calls inside the request
+timeout = int(os.environ.get("INSIGHTDB_TIMEOUT", 300))
@@ -0,0 +1,172 @@
+import os
+import json
+import time
+import uuid
+import hashlib
+import sqlite3
+import threading
+from contextlib import contextmanager
+
+
+def schema_fingerprint(schemas, column_fields=(), total_rows=False):
+    """Canonical hash of the parts of the schema an AI prompt is built from.
+
+    Table and column names are always hashed; ``column_fields`` adds per-column keys
+    (e.g. "type") and ``total_rows`` the summed row count, for templates whose prompt
+    shows them. Everything is sorted, so re-uploading the same files in any order maps
+    to the same fingerprint, while data the prompt never sees (such as appended rows
+    for the validation policy) does not invalidate the cached answer.
+    """
+    canonical = []
+    for name in sorted(schemas):
+        cols = sorted(
+            [c["name"]] + [c.get(field) for field in column_fields] for c in schemas[name].get("columns", [])
+        )
+        canonical.append([name, cols])
+    if total_rows:
+        canonical.append(sum(s.get("row_count", 0) for s in schemas.values()))
+    payload = json.dumps(canonical, separators=(",", ":"), default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class ResponseCache:
+    """Disk-backed (SQLite) cache for parsed LLM responses with TTL and size-based LRU eviction.
+
+    SQLite keeps the cache shared between worker processes and survives restarts. It
+    also holds short-lived claims on keys being generated, so identical requests in
+    other workers wait for the first one's answer instead of paying for their own.
+    """
+
+    def __init__(self, path, ttl_seconds=7 * 24 * 3600, max_bytes=50 * 1024 * 1024):
+        self.path = path
+        self.ttl_seconds = ttl_seconds
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "misses": 0, "expired": 0, "evictions": 0, "writes": 0}
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS responses ("
+                " key TEXT PRIMARY KEY, value TEXT NOT NULL, size INTEGER NOT NULL,"
+                " created_at REAL NOT NULL, accessed_at REAL NOT NULL)"
+            )
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS inflight ("
+                " key TEXT PRIMARY KEY, owner TEXT NOT NULL, expires_at REAL NOT NULL)"
+            )
+
+    @contextmanager
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=10)
+        try:
+            with conn:  # commits on success, rolls back on error
+                yield conn
+        finally:
+            conn.close()
+
+    @staticmethod
+    def make_key(model, template, template_version, fingerprint, extra=None):
+        parts = {"model": model, "template": template, "version": template_version, "fingerprint": fingerprint, "extra": extra}
+        return hashlib.sha256(json.dumps(parts, sort_keys=True, default=str).encode("utf-8")).hexdigest()
+
+    def get(self, key):
+        """Returns the cached value or None on a miss / expired entry."""
+        now = time.time()
+        with self._connect() as conn:
+            row = conn.execute("SELECT value, created_at FROM responses WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                self._bump("misses")
+                return None
+            value, created_at = row
+            if now - created_at > self.ttl_seconds:
+                conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+                self._bump("expired")
+                self._bump("misses")
+                return None
+            conn.execute("UPDATE responses SET accessed_at = ? WHERE key = ?", (now, key))
+        self._bump("hits")
+        return json.loads(value)
+
+    def set(self, key, value):
+        payload = json.dumps(value)
+        now = time.time()
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO responses (key, value, size, created_at, accessed_at) VALUES (?, ?, ?, ?, ?)",
+                (key, payload, len(payload), now, now),
+            )
+            self._evict(conn, now)
+        self._bump("writes")
+
+    def claim(self, key, lease_seconds):
+        """Marks ``key`` as being generated by the caller.
+
+        Returns an owner token to pass to release(), or None if another caller (in any
+        worker) holds an unexpired claim. Leases expire so a crashed worker cannot block others.
+        """
+        owner = f"{os.getpid()}-{uuid.uuid4().hex}"
+        now = time.time()
+        with self._connect() as conn:
+            conn.execute("DELETE FROM inflight WHERE key = ? AND expires_at < ?", (key, now))
+            inserted = conn.execute(
+                "INSERT OR IGNORE INTO inflight (key, owner, expires_at) VALUES (?, ?, ?)",
+                (key, owner, now + lease_seconds),
+            ).rowcount
+        return owner if inserted else None
+
+    def release(self, key, owner):
+        with self._connect() as conn:
+            conn.execute("DELETE FROM inflight WHERE key = ? AND owner = ?", (key, owner))
+
+    def wait_for(self, key, timeout, poll_seconds=0.2):
+        """Waits for another caller's claim on ``key`` to produce a value.
+
+        Returns the value, or None once the claim is released or expires without one
+        (the other caller failed) or ``timeout`` passes.
+        """
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            with self._connect() as conn:
+                row = conn.execute("SELECT value FROM responses WHERE key = ?", (key,)).fetchone()
+                claimed = conn.execute(
+                    "SELECT 1 FROM inflight WHERE key = ? AND expires_at >= ?", (key, time.time())
+                ).fetchone()
+            if row is not None:
+                self._bump("hits")
+                return json.loads(row[0])
+            if claimed is None:
+                return None
+            time.sleep(poll_seconds)
+        return None
+
+    def _evict(self, conn, now):
+        conn.execute("DELETE FROM responses WHERE created_at < ?", (now - self.ttl_seconds,))
+        total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        # Drop least recently used entries until we are back under budget
+        for key, size in conn.execute("SELECT key, size FROM responses ORDER BY accessed_at ASC").fetchall():
+            if total <= self.max_bytes:
+                break
+            conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+            total -= size
+            self._bump("evictions")
+
+    def _bump(self, name):
+        with self._lock:
+            self._stats[name] += 1
+
+    def stats(self):
+        with self._connect() as conn:
+            entries, size = conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM responses").fetchone()
+        with self._lock:
+            stats = dict(self._stats)
+        lookups = stats["hits"] + stats["misses"]
+        stats.update({
+            "entries": entries,
+            "bytes": size,
+            "max_bytes": self.max_bytes,
+            "ttl_seconds": self.ttl_seconds,
+            "hit_rate": round(stats["hits"] / lookups, 4) if lookups else 0.0,
+        })
+        return stats
@@ -0,0 +1,100 @@
+"""Local stand-in for the Vertex AI generateContent endpoint.
+
+Run it, then point the backend at it:
+
+    python mock_vertex.py --port 8085 --fail-first 3 --retry-after 2
+    INSIGHTDB_VERTEX_BASE_URL=http://127.0.0.1:8085 python app.py
+
+The first ``--fail-first`` requests get a 429 with a Retry-After header (and a
+Google-style RetryInfo body); later requests return a canned answer after
+``--delay`` seconds, which makes request coalescing easy to observe.
+``:streamGenerateContent`` requests get the canned answer as SSE chunks, one
+word every ``--chunk-delay`` seconds.
+"""
+import json
+import time
+import argparse
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+STREAM_ANSWER = "The customer_id column links orders to customers, and most orders were delivered on time."
+state = {"requests": 0, "lock": threading.Lock()}
+args = None
+
+
+class MockVertexHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive + chunked streaming, like the real endpoint
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers.get("Content-Length", 0)) or 0)
+        with state["lock"]:
+            state["requests"] += 1
+            n = state["requests"]
+        print(f"[mock] request #{n} {self.path}")
+
+        if n <= args.fail_first:
+            self._send_json(429, {
+                "error": {
+                    "code": 429,
+                    "message": "Resource exhausted (mock).",
+                    "status": "RESOURCE_EXHAUSTED",
+                    "details": [{"@type": "type.googleapis.com/google.rpc.RetryInfo", "retryDelay": f"{args.retry_after}s"}]
+                }
+            }, {"Retry-After": str(args.retry_after)})
+            return
+
+        if ":streamGenerateContent" in self.path:
+            self._stream_answer(len(body))
+            return
+
+        time.sleep(args.delay)
+        payload = json.loads(body or b"{}")
+        wants_json = payload.get("generationConfig", {}).get("responseMimeType") == "application/json"
+        text = json.dumps({"title": "Mock Project", "explanations": []}) if wants_json else "Mock answer from the local Vertex AI stub."
+        self._send_json(200, {
+            "candidates": [{"content": {"role": "model", "parts": [{"text": text}]}}],
+            "usageMetadata": {"promptTokenCount": len(body) // 4, "candidatesTokenCount": len(text) // 4, "totalTokenCount": (len(body) + len(text)) // 4}
+        })
+
+    def _stream_answer(self, prompt_bytes):
+        words = STREAM_ANSWER.split(" ")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        try:
+            for i, word in enumerate(words):
+                time.sleep(args.chunk_delay)
+                chunk = {"candidates": [{"content": {"role": "model", "parts": [{"text": word + (" " if i < len(words) - 1 else "")}]}}]}
+                if i == len(words) - 1:
+                    chunk["usageMetadata"] = {"promptTokenCount": prompt_bytes // 4, "candidatesTokenCount": len(words), "totalTokenCount": prompt_bytes // 4 + len(words)}
+                data = f"data: {json.dumps(chunk)}\r\n\r\n".encode("utf-8")
+                self.wfile.write(f"{len(data):x}\r\n".encode("ascii") + data + b"\r\n")
+                self.wfile.flush()
+            self.wfile.write(b"0\r\n\r\n")
+        except (BrokenPipeError, ConnectionResetError):
+            print("[mock] client cancelled the stream")
+
+    def _send_json(self, status, obj, headers=None):
+        data = json.dumps(obj).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        for k, v in (headers or {}).items():
+            self.send_header(k, v)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *log_args):
+        pass
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Mock Vertex AI endpoint")
+    parser.add_argument("--port", type=int, default=8085)
+    parser.add_argument("--fail-first", type=int, default=0, help="Answer the first N requests with 429")
+    parser.add_argument("--retry-after", type=int, default=1, help="Retry-After seconds sent with 429s")
+    parser.add_argument("--delay", type=float, default=0.5, help="Latency of successful responses")
+    parser.add_argument("--chunk-delay", type=float, default=0.2, help="Delay between streamed chunks")
+    args = parser.parse_args()
+    print(f"Mock Vertex AI listening on http://127.0.0.1:{args.port}")
+    ThreadingHTTPServer(("127.0.0.1", args.port), MockVertexHandler).serve_forever()
@@ -0,0 +1,114 @@
+import json
+import time
+import hashlib
+import threading
+from collections import deque
+
+
+def fingerprint(*parts):
+    """Stable short hash of JSON-serializable parts (node keys, schema fragments, policies)."""
+    payload = json.dumps(parts, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()[:16]
+
+
+class Pipeline:
+    """Memoized DAG of analysis nodes (per table, per column, per check).
+
+    Each node is identified by a name such as ``fk:orders.customer_id`` and declares
+    its inputs as ``{name: fingerprint}``. Inputs are content hashes of data or the
+    keys of upstream nodes, so a node reruns only when something it depends on
+    changed, and the report says which input did.
+    """
+
+    MAX_RUNS = 5
+
+    def __init__(self):
+        self._memo = {}       # node_id -> {"key", "inputs", "value", "table"}
+        self._col_hashes = {} # (id(df), column) -> (df, hash); df kept so the id is not reused
+        self._lock = threading.RLock()
+        self.runs = deque(maxlen=self.MAX_RUNS)
+
+    def begin_run(self, label):
+        with self._lock:
+            self.runs.append({"label": label, "started": time.time(), "nodes": []})
+
+    def node(self, node_id, inputs, compute, table=None):
+        """Returns the memoized value of ``node_id`` or recomputes it if any input changed.
+
+        The node's key (a hash of its inputs) is returned alongside the value so that
+        downstream nodes can use it as their input fingerprint: ``value, key = ...``.
+        """
+        key = fingerprint(node_id, inputs)
+        with self._lock:
+            prev = self._memo.get(node_id)
+            if prev is not None and prev["key"] == key:
+                self._record(node_id, "reused", None, 0.0)
+                return prev["value"], key
+
+        if prev is None:
+            reason = "new node"
+        else:
+            changed = sorted(k for k in set(inputs) | set(prev["inputs"]) if inputs.get(k) != prev["inputs"].get(k))
+            reason = "changed: " + ", ".join(changed)
+
+        started = time.monotonic()
+        value = compute()
+        elapsed_ms = round((time.monotonic() - started) * 1000, 2)
+        with self._lock:
+            self._memo[node_id] = {"key": key, "inputs": dict(inputs), "value": value, "table": table}
+            self._record(node_id, "recomputed", reason, elapsed_ms)
+        return value, key
+
+    def _record(self, node_id, status, reason, elapsed_ms):
+        if not self.runs:
+            self.begin_run("adhoc")
+        self.runs[-1]["nodes"].append({"node": node_id, "status": status, "reason": reason, "ms": elapsed_ms})
+
+    def column_hash(self, df, column):
+        """Content hash of one column (values + dtype), cached per DataFrame object."""
+        cache_key = (id(df), column)
+        with self._lock:
+            cached = self._col_hashes.get(cache_key)
+            if cached is not None and cached[0] is df:
+                return cached[1]
+        import pandas as pd
+        series = df[column]
+        try:
+            hashed = pd.util.hash_pandas_object(series, index=False).to_numpy()
+        except TypeError:
+            # Unhashable objects (lists, dicts) in the column: hash their string form
+            hashed = pd.util.hash_pandas_object(series.astype(str), index=False).to_numpy()
+        digest = hashlib.sha256(hashed.tobytes() + str(series.dtype).encode("utf-8")).hexdigest()[:16]
+        with self._lock:
+            self._col_hashes[cache_key] = (df, digest)
+        return digest
+
+    def table_hash(self, df):
+        return fingerprint([(str(c), self.column_hash(df, c)) for c in df.columns], len(df))
+
+    def retain_tables(self, table_names):
+        """Drops memoized nodes of tables that are no longer loaded."""
+        table_names = set(table_names)
+        with self._lock:
+            self._memo = {k: v for k, v in self._memo.items() if v["table"] is None or v["table"] in table_names}
+
+    def forget_frames(self, frames):
+        """Releases cached column hashes for DataFrames other than ``frames``."""
+        live = {id(df) for df in frames}
+        with self._lock:
+            self._col_hashes = {k: v for k, v in self._col_hashes.items() if k[0] in live}
+
+    def report(self):
+        with self._lock:
+            runs = []
+            for run in self.runs:
+                recomputed = [n for n in run["nodes"] if n["status"] == "recomputed"]
+                runs.append({
+                    "label": run["label"],
+                    "started": run["started"],
+                    "recomputed": len(recomputed),
+                    "reused": len(run["nodes"]) - len(recomputed),
+                    "recompute_ms": round(sum(n["ms"] for n in recomputed), 2),
+                    "nodes": run["nodes"],
+                })
+            return {"memoized_nodes": len(self._memo), "runs": runs}
@@ -0,0 +1,172 @@
+import re
+import pandas as pd
+from pipeline import Pipeline, fingerprint
+
+
+# Column-name lexicons (matched against snake_case tokens)
+SIGNED_TERMS = {"lat", "lng", "lon", "latitude", "longitude", "coord", "offset", "delta", "diff", "change",
+                "temp", "temperature", "balance", "profit", "margin", "growth", "pnl", "adjustment", "variance"}
+UNSIGNED_TERMS = {"price", "qty", "quantity", "count", "amount", "weight", "length", "height", "width", "age",
+                  "size", "cost", "freight", "installment", "installments", "total", "duration", "distance",
+                  "cm", "g", "kg", "num", "number", "score", "rating", "sequential", "payment", "value"}
+
+# (name tokens, range); applied only when the observed mean sits inside the range
+NAMED_RANGES = [
+    ({"lat", "latitude"}, [-90, 90]),
+    ({"lng", "lon", "longitude"}, [-180, 180]),
+    ({"month"}, [1, 12]),
+    ({"hour"}, [0, 23]),
+    ({"minute", "second"}, [0, 59]),
+    ({"percent", "pct", "percentage"}, [0, 100]),
+]
+
+REGEXES = {
+    "email": r"[^@\s]+@[^@\s]+\.[^@\s]+",
+    "zip": r"\d{4,5}(-?\d{3,4})?",
+    "phone": r"\+?[\d\s\-().]{7,20}",
+}
+REGEX_TERMS = {"email": {"email", "mail"}, "zip": {"zip", "postal", "postcode", "cep"}, "phone": {"phone", "tel", "mobile"}}
+# Patterns specific enough to detect from content alone; zip/phone also match arbitrary numeric codes
+CONTENT_ONLY_KINDS = {"email"}
+
+SAMPLE_ROWS = 5000
+
+
+def _tokens(name):
+    return set(re.split(r"[^a-z0-9]+", name.lower())) - {""}
+
+
+def merge_policies(base, override):
+    """Overlays ``override`` (e.g. the LLM policy) on ``base`` column by column; sequence rules are unioned."""
+    merged = {t: {c: dict(p) for c, p in cols.items()} for t, cols in base.items()}
+    for table, cols in (override or {}).items():
+        if not isinstance(cols, dict):
+            continue
+        for col, policy in cols.items():
+            if not isinstance(policy, dict):
+                continue
+            target = merged.setdefault(table, {}).setdefault(col, {})
+            for key, value in policy.items():
+                if value is None:
+                    continue
+                if key == "sequence_rules":
+                    rules = target.get("sequence_rules", [])
+                    target["sequence_rules"] = rules + [r for r in value if r not in rules]
+                else:
+                    target[key] = value
+    return merged
+
+
+class PolicyInferencer:
+    """Data-driven validation policy built locally from profiler statistics in milliseconds.
+
+    Produces the same shape as AIService.generate_validation_policy, so it can be used
+    on its own while the LLM policy is pending and as the fallback when it fails.
+    """
+
+    def __init__(self, tables, schemas, pipeline=None):
+        """
+        :param tables: Dictionary of {table_name: pd.DataFrame}
+        :param schemas: Dictionary of {table_name: schema_dict} from SchemaAnalyzer
+        :param pipeline: Shared memoization graph; unchanged tables reuse their inferred policy
+        """
+        self.tables = tables
+        self.schemas = schemas
+        self.pipeline = pipeline or Pipeline()
+
+    def infer(self):
+        policy = {}
+        for table_name, schema in self.schemas.items():
+            df = self.tables.get(table_name)
+            if df is None or len(df) == 0:
+                continue
+            inputs = {"data": self.pipeline.table_hash(df), "schema": fingerprint(schema)}
+            table_policy, _ = self.pipeline.node(
+                f"local_policy:{table_name}", inputs, lambda: self._infer_table(df, schema), table=table_name)
+            if table_policy:
+                policy[table_name] = table_policy
+        return policy
+
+    def _infer_table(self, df, schema):
+        table_policy = {}
+        for col_meta in schema.get("columns", []):
+            col_policy = self._infer_column(df, col_meta)
+            if col_policy:
+                table_policy[col_meta["name"]] = col_policy
+        for rule in self._infer_sequences(df, schema):
+            table_policy.setdefault(rule["before"], {}).setdefault("sequence_rules", []).append(rule)
+        return table_policy
+
+    def _infer_column(self, df, col_meta):
+        name = col_meta["name"]
+        tokens = _tokens(name)
+        result = {}
+
+        if col_meta["classification"] == "numeric" and "min" in col_meta:
+            # Sign: name lexicon first, then the observed distribution
+            negative_share = col_meta.get("negative_count", 0) / max(1, col_meta.get("non_null_count", len(df)))
+            if tokens & SIGNED_TERMS:
+                result["is_unsigned"] = False
+            elif tokens & UNSIGNED_TERMS:
+                result["is_unsigned"] = True
+            else:
+                # A handful of negatives looks like bad data; a real share means the column is signed
+                result["is_unsigned"] = negative_share < 0.05
+
+            mean = col_meta.get("mean")
+            for terms, bounds in NAMED_RANGES:
+                if tokens & terms and mean is not None and bounds[0] <= mean <= bounds[1]:
+                    result["range"] = bounds
+                    break
+
+        elif col_meta["classification"] in ("categorical", "other") and not pd.api.types.is_numeric_dtype(df[name]):
+            pattern = self._infer_regex(df[name], tokens)
+            if pattern:
+                result["regex"] = pattern
+
+        return result
+
+    def _infer_regex(self, series, tokens):
+        sample = series.dropna().astype(str).head(SAMPLE_ROWS)
+        if sample.empty:
+            return None
+        for kind, pattern in REGEXES.items():
+            hinted = bool(tokens & REGEX_TERMS[kind])
+            if not hinted and kind not in CONTENT_ONLY_KINDS:
+                continue
+            # Name hints need most values to agree; content alone needs near-unanimous agreement
+            threshold = 0.9 if hinted else 0.98
+            if sample.str.fullmatch(pattern).mean() >= threshold:
+                return pattern
+        return None
+
+    def _infer_sequences(self, df, schema):
+        """Pairwise monotonicity between timestamp columns, reduced to the direct ordering chain."""
+        ts_cols = [c["name"] for c in schema.get("columns", []) if c["classification"] == "timestamp"]
+        if len(ts_cols) < 2:
+            return []
+
+        sample = df[ts_cols].head(SAMPLE_ROWS)
+        parsed = {c: pd.to_datetime(sample[c], errors="coerce") for c in ts_cols}
+        parsed = {c: s for c, s in parsed.items() if s.notnull().mean() > 0.5}
+
+        before = {}
+        for a in parsed:
+            for b in parsed:
+                if a == b:
+                    continue
+                both = parsed[a].notnull() & parsed[b].notnull()
+                if both.sum() < 10:
+                    continue
+                ordered = (parsed[a][both] <= parsed[b][both]).mean()
+                strictly = (parsed[a][both] < parsed[b][both]).mean()
+                if ordered >= 0.99 and strictly > 0:
+                    before.setdefault(a, set()).add(b)
+
+        # Transitive reduction: drop a->c when a->b->c exists, so one bad row is not penalized per hop
+        rules = []
+        for a, afters in before.items():
+            for c in afters:
+                if not any(c in before.get(b, set()) for b in afters if b != c):
+                    rules.append({"before": a, "after": c})
+        return rules
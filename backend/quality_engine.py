@@ -1,228 +1,445 @@
+import re
 import pandas as pd
 import numpy as np
+from pipeline import Pipeline, fingerprint
 
 class QualityEngine:
-    def __init__(self, tables, schemas, validation_policy=None):
+    OUTLIER_TOP_K = 10
+    HISTOGRAM_BINS = 20
+    TOP_K_CATEGORIES = 10
+    QUANTILES = [0.01, 0.05, 0.25, 0.5, 0.75, 0.95, 0.99]
+
+    def __init__(self, tables, schemas, validation_policy=None, pipeline=None):
         """
         :param tables: Dictionary of {table_name: pd.DataFrame}
         :param schemas: Dictionary of {table_name: schema_dict}
         :param validation_policy: AI-generated policy for context-aware auditing
+        :param pipeline: Shared memoization graph; checks whose inputs are unchanged are reused
         """
         self.tables = tables
         self.schemas = schemas
         self.validation_policy = validation_policy or {}
+        self.pipeline = pipeline or Pipeline()
         self.metrics = {}
+        self.outliers = {} # {table: {column: top-K outlier rows + percentile/correlation context}}
+        self.distributions = {} # {table: {column: histogram / top-K / per-day counts}}
+        self.relationships = {} # {table: [FK edge key-index stats]}, input of the relationship graph
+        self._base = {}
+        self._base_keys = {} # {table: fingerprint of every base node feeding the policy pass}
 
     def compute_metrics(self):
         """Computes quality metrics and upgraded Trust Score for all tables."""
-        
-        global_max_date = self._get_global_max_date()
+        if not self._base:
+            self.compute_base_metrics()
 
         for table_name, df in self.tables.items():
-            schema = self.schemas.get(table_name, {})
-            table_metrics = {
-                "completeness": 0.0,
-                "uniqueness": 0.0,
-                "freshness": 0.0,
-                "orphan_rate": 0.0,
-                "outlier_rate": 0.0,
-                "negative_rate": 0.0,
-                "trust_score": 0.0,
-                "issues": [],
-                "column_stats": {},
-                "sub_scores": {}
+            inputs = {
+                "base": self._base_keys[table_name],
+                "policy": fingerprint(self.validation_policy.get(table_name, {})),
+                # Range, pattern and sequence rules read the data directly
+                "data": self.pipeline.table_hash(df),
             }
-            
-            total_rows = len(df)
-            if total_rows == 0:
-                self.metrics[table_name] = table_metrics
-                continue
-                
-            # 1. Completeness (Weighted 20%)
-            total_cells = df.size
-            total_nulls = df.isnull().sum().sum()
-            completeness = (total_cells - total_nulls) / total_cells
-            table_metrics["completeness"] = round(completeness * 100, 2)
-            if completeness < 0.9: table_metrics["issues"].append("High number of missing values")
-
-            # 2. Identifier Health (Weighted 25%)
-            # Check primary keys uniqueness and nullability
-            id_sub_score = 100
-            pk_cols = schema.get("potential_keys", [])
-            for col in pk_cols:
-                # PK should be 100% unique and 0% null already by definition in analyzer, 
-                # but let's check identifier columns in general.
-                pass
-            
-            # General health of all identifier columns
-            id_cols = [c for c in schema.get("columns", []) if c["classification"] == "identifier"]
-            if id_cols:
-                id_nulls = sum([c["null_count"] for c in id_cols])
-                id_uniqueness_avg = sum([c["unique_count"] for c in id_cols]) / (len(id_cols) * total_rows)
-                id_sub_score = (id_uniqueness_avg * 80) + ((1 - (id_nulls / (len(id_cols) * total_rows))) * 20)
-            
-            table_metrics["sub_scores"]["identifier_health"] = round(id_sub_score, 2)
-
-            # 3. FK Integrity / Referential Integrity (Weighted 25%)
-            fk_sub_score = 100
-            total_orphans = 0
-            fks = schema.get("potential_foreign_keys", [])
-            if fks:
-                for fk in fks:
-                    col = fk["column"]
-                    target_table_name = fk["suggested_tables"][0] # Just take first suggestion for now
-                    if target_table_name in self.tables:
-                        target_df = self.tables[target_table_name]
-                        # Assume PK in target is first potential_key or just 'id' if exists
-                        target_pk = self.schemas[target_table_name]["potential_keys"][0] if self.schemas[target_table_name]["potential_keys"] else None
-                        
-                        if target_pk:
-                            child_ids = set(df[col].dropna())
-                            parent_ids = set(target_df[target_pk])
-                            orphans = child_ids - parent_ids
-                            
-                            if orphans:
-                                orphan_count = df[df[col].isin(orphans)].shape[0]
-                                orphan_rate = orphan_count / total_rows
-                                total_orphans += orphan_count
-                                table_metrics["issues"].append(f"{round(orphan_rate*100, 2)}% orphans in {col} (ref {target_table_name})")
-                
-                fk_integrity_rate = 1 - (total_orphans / (len(fks) * total_rows))
-                fk_sub_score = fk_integrity_rate * 100
-            
-            table_metrics["orphan_rate"] = round((total_orphans / total_rows) * 100, 2) if total_rows > 0 else 0
-            table_metrics["sub_scores"]["fk_integrity"] = round(fk_sub_score, 2)
-
-            # 4. Numeric Sanity (Weighted 15%)
-            sanity_sub_score = 100
-            total_negatives = 0
-            total_outliers = 0
-            num_numeric_cols = 0
-            
-            for col_meta in schema.get("columns", []):
-                col = col_meta["name"]
-                if col_meta["classification"] == "numeric":
-                    num_numeric_cols += 1
-                    series = df[col].dropna()
-                    if series.empty: continue
-                    
-                    # Store stats
-                    mean = series.mean()
-                    std = series.std()
-                    table_metrics["column_stats"][col] = {"mean": float(mean), "std": float(std)}
-                    
-                    # Smart Negative Check (AI Driven)
-                    policy = self.validation_policy.get(table_name, {}).get(col, {})
-                    is_unsigned = policy.get("is_unsigned", True) # Default to unsigned for safety
-                    
-                    negs = (series < 0).sum()
-                    if negs > 0 and is_unsigned:
-                        total_negatives += negs
-                        table_metrics["issues"].append(f"Negative values in {col} (expected unsigned)")
-                    elif negs > 0:
-                        # If AI said signed, it's NOT a negative_rate penalty
-                        pass
-                    
-                    # Smart Range Check (AI Driven)
-                    p_range = policy.get("range")
-                    if p_range and len(p_range) == 2:
-                        out_of_range = ((series < p_range[0]) | (series > p_range[1])).sum()
-                        if out_of_range > 0:
-                            table_metrics["issues"].append(f"Value range violation in {col} (expected {p_range})")
-                            total_outliers += out_of_range
+            self.metrics[table_name], _ = self.pipeline.node(
+                f"metrics:{table_name}", inputs,
+                lambda: self._apply_policy(table_name, df, self._base[table_name]), table=table_name)
+
+        return self.metrics
+
+    def compute_base_metrics(self):
+        """Runs every check that does not depend on the validation policy.
+
+        This is the expensive pass over the data, so it can start before the AI
+        policy is available; compute_metrics() then only applies the policy rules.
+        Each check is a pipeline node, so only tables/columns whose content changed are recomputed.
+        """
+        timestamps = {t: self._timestamp_profiles(t, df) for t, df in self.tables.items()}
+        table_max = {t: self._table_max_date(profiles) for t, profiles in timestamps.items()}
+        global_max_date, _ = self.pipeline.node(
+            "global_max_date", {t: str(m) for t, m in table_max.items()}, lambda: self._get_global_max_date(table_max))
+        # Downstream nodes depend on the value, not on which tables fed it: adding a table without
+        # dates (or with older ones) must not invalidate every table's freshness
+        global_key = fingerprint(str(global_max_date))
+
+        for table_name, df in self.tables.items():
+            self._base[table_name] = self._compute_table_base(
+                table_name, df, timestamps[table_name], table_max[table_name], global_max_date, global_key)
+            self.outliers[table_name] = self._base[table_name]["outliers"]
+            self.distributions[table_name] = self._base[table_name]["distributions"]
+            self.relationships[table_name] = self._base[table_name]["relationships"]
+
+        return self._base
+
+    def _compute_table_base(self, table_name, df, timestamps, table_max, global_max_date, global_key):
+        schema = self.schemas.get(table_name, {})
+        base = {"total_rows": len(df), "issues": [], "numeric": {}, "categorical_issues": [], "outliers": {}, "distributions": {}, "relationships": []}
+        keys = {}
+        total_rows = len(df)
+        if total_rows == 0:
+            self._base_keys[table_name] = fingerprint(total_rows)
+            return base
+
+        def node(name, inputs, compute):
+            value, keys[name] = self.pipeline.node(f"{name}:{table_name}", inputs, compute, table=table_name)
+            return value
+
+        def col_hash(col):
+            return self.pipeline.column_hash(df, col)
+
+        # 1. Completeness (Weighted 20%)
+        completeness = node("completeness", {"data": self.pipeline.table_hash(df)}, lambda: self._completeness(df))
+        base["completeness"] = completeness
+        if completeness < 0.9: base["issues"].append("High number of missing values")
+
+        # 2. Identifier Health (Weighted 25%)
+        # General health of all identifier columns (PK uniqueness/nullability is already enforced by the analyzer)
+        id_cols = [c for c in schema.get("columns", []) if c["classification"] == "identifier"]
+        base["id_sub_score"] = node("identifiers", {"columns": fingerprint(id_cols), "rows": str(total_rows)},
+                                    lambda: self._identifier_health(id_cols, total_rows))
+
+        # 3. FK Integrity / Referential Integrity (Weighted 25%)
+        fk_sub_score = 100
+        total_orphans = 0
+        fks = schema.get("potential_foreign_keys", [])
+        if fks:
+            for fk in fks:
+                col = fk["column"]
+                target_table_name = fk["suggested_tables"][0] # Just take first suggestion for now
+                if target_table_name in self.tables:
+                    target_df = self.tables[target_table_name]
+                    # Assume PK in target is first potential_key or just 'id' if exists
+                    target_pk = self.schemas[target_table_name]["potential_keys"][0] if self.schemas[target_table_name]["potential_keys"] else None
                     
-                    # Outliers (Z-score > 3)
-                    if std > 0:
-                        outliers = (np.abs((series - mean) / std) > 3).sum()
-                        total_outliers += outliers
-                        if outliers / total_rows > 0.05:
-                            table_metrics["issues"].append(f"High outlier rate in {col} ({round(outliers/total_rows*100, 1)}%)")
-
-            if num_numeric_cols > 0:
-                neg_rate = total_negatives / (num_numeric_cols * total_rows)
-                out_rate = total_outliers / (num_numeric_cols * total_rows)
-                sanity_sub_score = (1 - neg_rate) * 50 + (1 - out_rate) * 50
+                    if target_pk:
+                        inputs = {"child": col_hash(col), "parent": f"{target_table_name}.{target_pk}:{self.pipeline.column_hash(target_df, target_pk)}"}
+                        profile = node(f"fk.{col}", inputs, lambda: self._fk_profile(df[col], target_df[target_pk]))
+                        base["relationships"].append(dict(profile, column=col, parent_table=target_table_name, parent_key=target_pk))
+                        orphan_count = profile["orphan_rows"]
+                        if orphan_count:
+                            orphan_rate = orphan_count / total_rows
+                            total_orphans += orphan_count
+                            base["issues"].append(f"{round(orphan_rate*100, 2)}% orphans in {col} (ref {target_table_name})")
+            
+            fk_integrity_rate = 1 - (total_orphans / (len(fks) * total_rows))
+            fk_sub_score = fk_integrity_rate * 100
+        base["total_orphans"] = total_orphans
+        base["fk_sub_score"] = fk_sub_score
+
+        # 4. Numeric statistics (policy rules are applied later)
+        numeric_cols = [c["name"] for c in schema.get("columns", []) if c["classification"] == "numeric"]
+        corr = None
+        if len(numeric_cols) > 1:
+            corr = node("correlation", {c: col_hash(c) for c in numeric_cols}, lambda: df[numeric_cols].corr())
+        for col in numeric_cols:
+            stats, distribution, outliers = node(f"numeric.{col}", {"column": col_hash(col)},
+                                                 lambda: self._numeric_profile(df[col].dropna()))
+            if distribution is not None:
+                base["distributions"][col] = distribution
+            if outliers is not None:
+                base["outliers"][col] = dict(outliers, correlated=self._correlated(corr, col))
+            base["numeric"][col] = stats
+
+        # 5. Categorical Rare Values
+        for col_meta in schema.get("columns", []):
+            col = col_meta["name"]
+            if col_meta["classification"] == "categorical":
+                distribution, rare_count = node(f"categorical.{col}", {"column": col_hash(col)},
+                                                lambda: self._categorical_profile(df[col].dropna()))
+                if distribution is None: continue
+                base["distributions"][col] = distribution
+                if rare_count:
+                    base["categorical_issues"].append(f"{rare_count} rare categories in {col} (<1% frequency)")
+
+        # 6. Freshness (Weighted 15%)
+        base["freshness"] = node("freshness", {"table_max": str(table_max), "global_max": global_key},
+                                 lambda: self._calculate_freshness(table_max, global_max_date))
+        for col, (_, dist, key) in timestamps.items():
+            keys[f"timestamp.{col}"] = key
+            if dist:
+                base["distributions"][col] = dist
+
+        self._base_keys[table_name] = fingerprint(sorted(keys.items()))
+        return base
+
+    def _completeness(self, df):
+        total_cells = df.size
+        total_nulls = df.isnull().sum().sum()
+        return float((total_cells - total_nulls) / total_cells)
+
+    def _identifier_health(self, id_cols, total_rows):
+        if not id_cols:
+            return 100
+        id_nulls = sum([c["null_count"] for c in id_cols])
+        id_uniqueness_avg = sum([c["unique_count"] for c in id_cols]) / (len(id_cols) * total_rows)
+        return (id_uniqueness_avg * 80) + ((1 - (id_nulls / (len(id_cols) * total_rows))) * 20)
+
+    def _fk_profile(self, child, parent):
+        """Key-index stats of one FK edge; the relationship graph is built from these without rejoining the data."""
+        child_counts = child.dropna().value_counts()
+        parent_counts = parent.dropna().value_counts()
+        matched = child_counts.index.isin(parent_counts.index)
+        matched_counts = child_counts[matched]
+        return {
+            "child_rows": int(child_counts.sum()),
+            "orphan_rows": int(child_counts[~matched].sum()),
+            "child_keys": int(len(child_counts)),
+            "orphan_keys": int((~matched).sum()),
+            "parent_keys": int(len(parent_counts)),
+            "matched_parent_keys": int(len(matched_counts)),
+            "max_children_per_parent": int(matched_counts.max()) if len(matched_counts) else 0
+        }
+
+    def _numeric_profile(self, series):
+        """Stats, distribution and top outliers of one numeric column (correlations are attached by the caller)."""
+        stats = {"empty": series.empty}
+        if series.empty:
+            return stats, None, None
+        if pd.api.types.is_bool_dtype(series):
+            # Bool columns are classified numeric; quantiles and histograms need 0/1 values
+            series = series.astype("int8")
+        mean = series.mean()
+        std = series.std()
+        stats.update({"mean": float(mean), "std": float(std), "negatives": int((series < 0).sum()), "z_outliers": 0})
+        quantiles = {f"p{int(q * 100)}": float(v) for q, v in series.quantile(self.QUANTILES).items()}
+        distribution = self._numeric_distribution(series, quantiles)
+        outliers = None
+        # Outliers (Z-score > 3)
+        if std > 0:
+            z = np.abs((series - mean) / std)
+            stats["z_outliers"] = int((z > 3).sum())
+            if stats["z_outliers"]:
+                outliers = self._outlier_context(series, z, quantiles)
+        return stats, distribution, outliers
+
+    def _categorical_profile(self, series):
+        if series.empty:
+            return None, 0
+        counts = series.value_counts()
+        val_counts = counts / len(series)
+        return self._categorical_distribution(counts), int((val_counts < 0.01).sum())
+
+    def _apply_policy(self, table_name, df, base):
+        """Combines the policy-independent base results with the validation policy into final metrics."""
+        table_metrics = {
+            "completeness": 0.0,
+            "uniqueness": 0.0,
+            "freshness": 0.0,
+            "orphan_rate": 0.0,
+            "outlier_rate": 0.0,
+            "negative_rate": 0.0,
+            "trust_score": 0.0,
+            "issues": [],
+            "column_stats": {},
+            "sub_scores": {}
+        }
+
+        total_rows = base["total_rows"]
+        if total_rows == 0:
+            return table_metrics
+
+        completeness = base["completeness"]
+        id_sub_score = base["id_sub_score"]
+        fk_sub_score = base["fk_sub_score"]
+        table_metrics["completeness"] = round(completeness * 100, 2)
+        table_metrics["issues"].extend(base["issues"])
+        table_metrics["sub_scores"]["identifier_health"] = round(id_sub_score, 2)
+        table_metrics["orphan_rate"] = round((base["total_orphans"] / total_rows) * 100, 2)
+        table_metrics["sub_scores"]["fk_integrity"] = round(fk_sub_score, 2)
+
+        # 4. Numeric Sanity (Weighted 15%)
+        sanity_sub_score = 100
+        total_negatives = 0
+        total_outliers = 0
+        num_numeric_cols = len(base["numeric"])
+        table_policy = self.validation_policy.get(table_name, {})
+
+        for col, stats in base["numeric"].items():
+            if stats["empty"]: continue
+            table_metrics["column_stats"][col] = {"mean": stats["mean"], "std": stats["std"]}
+
+            # Smart Negative Check (AI Driven)
+            policy = table_policy.get(col, {})
+            is_unsigned = policy.get("is_unsigned", True) # Default to unsigned for safety
             
-            table_metrics["negative_rate"] = round((total_negatives / total_rows) * 100, 2) if total_rows > 0 else 0
-            table_metrics["outlier_rate"] = round((total_outliers / total_rows) * 100, 2) if total_rows > 0 else 0
-            table_metrics["sub_scores"]["numeric_sanity"] = round(sanity_sub_score, 2)
-
-            # 5. Categorical Rare Values
-            for col_meta in schema.get("columns", []):
-                col = col_meta["name"]
-                if col_meta["classification"] == "categorical":
-                    series = df[col].dropna()
-                    if series.empty: continue
-                    val_counts = series.value_counts(normalize=True)
-                    rare_mask = val_counts < 0.01
-                    if rare_mask.any():
-                        rare_count = rare_mask.sum()
-                        table_metrics["issues"].append(f"{rare_count} rare categories in {col} (<1% frequency)")
-
-            # 6. Freshness (Weighted 15%)
-            freshness_score = self._calculate_freshness(df, global_max_date)
-            table_metrics["freshness"] = round(freshness_score, 2)
-            table_metrics["sub_scores"]["freshness"] = freshness_score
-
-            # 7. AI Sequence Rules (Contextual Integrity)
-            table_policy = self.validation_policy.get(table_name, {})
-            sequence_penalty = 0
-            for col, policy in table_policy.items():
-                rules = policy.get("sequence_rules", [])
-                for rule in rules:
-                    before_col = rule.get("before")
-                    after_col = rule.get("after")
-                    if before_col in df.columns and after_col in df.columns:
-                        # e.g. purchase before delivery
-                        try:
-                            t_before = pd.to_datetime(df[before_col], errors='coerce')
-                            t_after = pd.to_datetime(df[after_col], errors='coerce')
-                            violations = (t_before > t_after).sum()
-                            if violations > 0:
-                                table_metrics["issues"].append(f"Logic Error: {before_col} appears AFTER {after_col} in {violations} rows")
-                                sequence_penalty += (violations / total_rows) * 10
-                        except: pass
+            negs = stats["negatives"]
+            if negs > 0 and is_unsigned:
+                total_negatives += negs
+                table_metrics["issues"].append(f"Negative values in {col} (expected unsigned)")
+            # If AI said signed, negatives are NOT a negative_rate penalty
             
-            # Adjust trust score based on sequence violations
-            trust_score_deduction = min(sequence_penalty, 20)
-
-            # TRUST SCORE CALCULATION (Weighted Average)
-            trust_score = (
-                (id_sub_score * 0.25) +
-                (fk_sub_score * 0.25) +
-                (completeness * 100 * 0.20) +
-                (sanity_sub_score * 0.15) +
-                (freshness_score * 0.15)
-            )
-            table_metrics["trust_score"] = max(0, round(trust_score - trust_score_deduction, 2))
+            # Smart Range Check (AI Driven)
+            p_range = policy.get("range")
+            if p_range and len(p_range) == 2:
+                series = df[col].dropna()
+                out_of_range = ((series < p_range[0]) | (series > p_range[1])).sum()
+                if out_of_range > 0:
+                    table_metrics["issues"].append(f"Value range violation in {col} (expected {p_range})")
+                    total_outliers += out_of_range
             
-            if table_metrics["trust_score"] < 60:
-                 table_metrics["issues"].append("Critical: Low overall trust score.")
+            outliers = stats["z_outliers"]
+            total_outliers += outliers
+            if outliers / total_rows > 0.05:
+                table_metrics["issues"].append(f"High outlier rate in {col} ({round(outliers/total_rows*100, 1)}%)")
 
-            self.metrics[table_name] = table_metrics
+        if num_numeric_cols > 0:
+            neg_rate = total_negatives / (num_numeric_cols * total_rows)
+            out_rate = total_outliers / (num_numeric_cols * total_rows)
+            sanity_sub_score = (1 - neg_rate) * 50 + (1 - out_rate) * 50
+        
+        table_metrics["negative_rate"] = round((total_negatives / total_rows) * 100, 2)
+        table_metrics["outlier_rate"] = round((total_outliers / total_rows) * 100, 2)
+        table_metrics["sub_scores"]["numeric_sanity"] = round(sanity_sub_score, 2)
 
-        return self.metrics
+        # 5. Categorical Rare Values
+        table_metrics["issues"].extend(base["categorical_issues"])
 
-    def _get_global_max_date(self):
-        global_max_date = pd.Timestamp.min
-        for df in self.tables.values():
-            for col in df.columns:
-                if 'date' in col.lower() or 'time' in col.lower():
+        # 5b. Pattern Checks (policy regex on text columns)
+        for col, policy in table_policy.items():
+            pattern = policy.get("regex")
+            if not pattern or col not in df.columns or pd.api.types.is_numeric_dtype(df[col]):
+                continue
+            try:
+                mismatches = int((~df[col].dropna().astype(str).str.fullmatch(pattern)).sum())
+            except re.error:
+                continue
+            if mismatches > 0:
+                table_metrics["issues"].append(f"Pattern violation in {col}: {mismatches} values do not match {pattern}")
+
+        # 6. Freshness (Weighted 15%)
+        freshness_score = base["freshness"]
+        table_metrics["freshness"] = round(freshness_score, 2)
+        table_metrics["sub_scores"]["freshness"] = freshness_score
+
+        # 7. AI Sequence Rules (Contextual Integrity)
+        sequence_penalty = 0
+        for col, policy in table_policy.items():
+            rules = policy.get("sequence_rules", [])
+            for rule in rules:
+                before_col = rule.get("before")
+                after_col = rule.get("after")
+                if before_col in df.columns and after_col in df.columns:
+                    # e.g. purchase before delivery
                     try:
-                        tm = pd.to_datetime(df[col], errors='coerce').max()
-                        if pd.notnull(tm) and tm > global_max_date: global_max_date = tm
+                        t_before = pd.to_datetime(df[before_col], errors='coerce')
+                        t_after = pd.to_datetime(df[after_col], errors='coerce')
+                        violations = (t_before > t_after).sum()
+                        if violations > 0:
+                            table_metrics["issues"].append(f"Logic Error: {before_col} appears AFTER {after_col} in {violations} rows")
+                            sequence_penalty += (violations / total_rows) * 10
                     except: pass
-        return global_max_date if global_max_date != pd.Timestamp.min else pd.Timestamp.now()
+        
+        # Adjust trust score based on sequence violations
+        trust_score_deduction = min(sequence_penalty, 20)
 
-    def _calculate_freshness(self, df, global_max):
-        table_max = None
+        # TRUST SCORE CALCULATION (Weighted Average)
+        trust_score = (
+            (id_sub_score * 0.25) +
+            (fk_sub_score * 0.25) +
+            (completeness * 100 * 0.20) +
+            (sanity_sub_score * 0.15) +
+            (freshness_score * 0.15)
+        )
+        table_metrics["trust_score"] = max(0, round(trust_score - trust_score_deduction, 2))
+        
+        if table_metrics["trust_score"] < 60:
+             table_metrics["issues"].append("Critical: Low overall trust score.")
+
+        return table_metrics
+
+    def _numeric_distribution(self, series, quantiles):
+        values = series[np.isfinite(series)] if pd.api.types.is_float_dtype(series) else series
+        counts, edges = np.histogram(values, bins=self.HISTOGRAM_BINS) if len(values) else ([], [])
+        return {
+            "kind": "numeric",
+            "count": int(len(series)),
+            "min": float(values.min()) if len(values) else None,
+            "max": float(values.max()) if len(values) else None,
+            "bin_edges": [float(e) for e in edges],
+            "counts": [int(c) for c in counts],
+            "quantiles": quantiles
+        }
+
+    def _categorical_distribution(self, counts):
+        top = counts.head(self.TOP_K_CATEGORIES)
+        return {
+            "kind": "categorical",
+            "count": int(counts.sum()),
+            "distinct": int(len(counts)),
+            "top": [{"value": str(v), "count": int(c)} for v, c in top.items()],
+            "other_count": int(counts.sum() - top.sum())
+        }
+
+    def _timestamp_distribution(self, parsed):
+        parsed = parsed.dropna()
+        if parsed.empty:
+            return None
+        # Per-day counts; long spans fall back to months to keep the payload to a few KB
+        span_days = (parsed.max() - parsed.min()).days
+        granularity = "day" if span_days <= 400 else "month"
+        keys = parsed.dt.strftime("%Y-%m-%d" if granularity == "day" else "%Y-%m")
+        counts = keys.value_counts().sort_index()
+        return {
+            "kind": "timestamp",
+            "count": int(len(parsed)),
+            "min": parsed.min().isoformat(),
+            "max": parsed.max().isoformat(),
+            "granularity": granularity,
+            "counts": {k: int(v) for k, v in counts.items()}
+        }
+
+    def _outlier_context(self, series, z, quantiles):
+        """Top-K outliers of a column plus the compact context used to explain them."""
+        top = z[z > 3].nlargest(self.OUTLIER_TOP_K)
+        return {
+            # Loaded frames use a RangeIndex, so labels double as the iloc row_index used by the API
+            "rows": [{"row_index": int(idx), "value": float(series[idx]), "z": round(float(zv), 2)} for idx, zv in top.items()],
+            "percentiles": quantiles
+        }
+
+    def _correlated(self, corr, col):
+        correlated = []
+        if corr is not None:
+            others = corr[col].drop(col).dropna()
+            for other, r in others.reindex(others.abs().sort_values(ascending=False).index).head(2).items():
+                if abs(r) >= 0.3:
+                    correlated.append({"column": other, "corr": round(float(r), 3)})
+        return correlated
+
+    def _timestamp_profiles(self, table_name, df):
+        """Parses each date/time-named column once: {column: (max, distribution, node key)}."""
+        profiles = {}
         for col in df.columns:
             if 'date' in col.lower() or 'time' in col.lower():
-                try:
-                    tm = pd.to_datetime(df[col], errors='coerce').max()
-                    if pd.notnull(tm) and (table_max is None or tm > table_max): table_max = tm
-                except: pass
-        
+                (col_max, dist), key = self.pipeline.node(
+                    f"timestamp.{col}:{table_name}", {"column": self.pipeline.column_hash(df, col)},
+                    lambda: self._timestamp_profile(df[col]), table=table_name)
+                profiles[col] = (col_max, dist, key)
+        return profiles
+
+    def _timestamp_profile(self, series):
+        try:
+            parsed = pd.to_datetime(series, errors='coerce')
+            col_max = parsed.max()
+        except: return None, None
+        return (col_max if pd.notnull(col_max) else None), self._timestamp_distribution(parsed)
+
+    def _table_max_date(self, profiles):
+        table_max = None
+        for tm, _, _ in profiles.values():
+            try:
+                if tm is not None and (table_max is None or tm > table_max): table_max = tm
+            except: pass
+        return table_max
+
+    def _get_global_max_date(self, table_max):
+        global_max_date = pd.Timestamp.min
+        for tm in table_max.values():
+            try:
+                if tm is not None and tm > global_max_date: global_max_date = tm
+            except: pass
+        # None when no table has dates; freshness then falls back to its neutral score
+        return global_max_date if global_max_date != pd.Timestamp.min else None
+
+    def _calculate_freshness(self, table_max, global_max):
         if not table_max: return 50.0
         days_diff = (global_max - table_max).days
         if days_diff < 30: return 100.0
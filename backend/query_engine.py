@@ -0,0 +1,261 @@
+import os
+import json
+import hashlib
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+
+class QueryEngine:
+    """Projection / filter / sort / group-by queries with keyset pagination over loaded tables.
+
+    Everything is vectorized pandas. Sort permutations are computed once per
+    (table, sort spec) and cached together with their inverse, as are filter masks,
+    so paging through a 10M-row table is a slice of cached arrays rather than a
+    re-sort and re-scan. The cache is bounded by bytes (CACHE_BYTES), not entries,
+    since every worker process keeps its own.
+
+    A query spec looks like::
+
+        {
+          "columns": ["order_id", "price"],
+          "filters": [{"column": "price", "op": "gt", "value": 100}],
+          "sort": [{"column": "price", "desc": true}],
+          "group_by": ["seller_id"],
+          "aggregates": [{"column": "price", "func": "mean"}],
+          "limit": 500,
+          "cursor": "<next_cursor from the previous page>"
+        }
+
+    Cursors are bound to the data version and to the filters/sort/grouping of the
+    query that issued them; reusing one after a re-upload or with another spec is an error.
+    """
+
+    MAX_LIMIT = 10000
+    CHUNK_ROWS = 1000
+    CACHE_ENTRIES = 8
+    CACHE_BYTES = int(os.environ.get("INSIGHTDB_QUERY_CACHE_MB", 128)) * 1024 * 1024
+
+    FILTER_OPS = {
+        "eq": lambda s, v: s == v,
+        "ne": lambda s, v: s != v,
+        "lt": lambda s, v: s < v,
+        "le": lambda s, v: s <= v,
+        "gt": lambda s, v: s > v,
+        "ge": lambda s, v: s >= v,
+        "in": lambda s, v: s.isin(v),
+        "contains": lambda s, v: s.astype(str).str.contains(str(v), case=False, regex=False, na=False),
+        "isnull": lambda s, v: s.isnull(),
+        "notnull": lambda s, v: s.notnull(),
+    }
+    AGG_FUNCS = {"count", "sum", "mean", "min", "max", "nunique"}
+
+    def __init__(self, tables, version=None):
+        """
+        :param tables: Dictionary of {table_name: pd.DataFrame}. Caches assume these are
+            immutable, so build a new QueryEngine whenever the tables are reloaded.
+        :param version: Snapshot version the tables were published as; embedded in cursors
+        """
+        self.tables = tables
+        self.version = version
+        self._cache = OrderedDict() # key -> (value, nbytes), least recently used first
+        self._cache_bytes = 0
+
+    def execute(self, table_name, spec):
+        """Validates the spec and returns a generator of NDJSON lines for one page.
+
+        Lines are: a header ``{"columns": [...]}``, one ``{"rows": [[...], ...]}`` per
+        chunk, and a trailer ``{"row_count": n, "next_cursor": ...}``.
+        """
+        df = self.tables.get(table_name)
+        if df is None:
+            raise KeyError(table_name)
+
+        limit = min(int(spec.get("limit", 500)), self.MAX_LIMIT)
+        if limit <= 0:
+            raise ValueError("limit must be positive.")
+        self._check_spec(spec)
+
+        mask = None
+        if spec.get("group_by") or spec.get("aggregates"):
+            # Filters are applied before aggregation
+            frame, order, rank = self._grouped(table_name, df, spec)
+        else:
+            frame = df
+            order, rank = self._sort_order(table_name, df, spec.get("sort", []))
+            if spec.get("filters"):
+                mask = self._cached_mask(table_name, df, spec["filters"])
+
+        columns = spec.get("columns") or list(frame.columns)
+        self._check_columns(frame, columns)
+
+        token = self._cursor_token(table_name, spec)
+        start = self._seek(rank, spec.get("cursor"), token)
+        return self._stream(frame, columns, order, rank, mask, start, limit, token)
+
+    def _check_spec(self, spec):
+        """Structural validation, so malformed specs are a ValueError (400) rather than a KeyError."""
+        for key in ("filters", "sort", "aggregates"):
+            entries = spec.get(key) or []
+            if not isinstance(entries, list) or not all(isinstance(e, dict) and "column" in e for e in entries):
+                raise ValueError(f"'{key}' must be a list of objects with a 'column'.")
+        for key in ("columns", "group_by"):
+            if not isinstance(spec.get(key) or [], list):
+                raise ValueError(f"'{key}' must be a list of column names.")
+
+    def _cursor_token(self, table_name, spec):
+        """Identifies the data version and the row ordering a cursor position refers to."""
+        shape = {k: spec.get(k) for k in ("filters", "sort", "group_by", "aggregates")}
+        payload = json.dumps([self.version, table_name, shape], sort_keys=True, default=str)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()[:12]
+
+    def _stream(self, frame, columns, order, rank, mask, start, limit, token):
+        yield json.dumps({"columns": columns}) + "\n"
+
+        sent = 0
+        last_pos = None
+        cursor = start
+        total = len(order)
+        projected = frame[columns]
+        while sent < limit and cursor < total:
+            # Scan ahead in windows; the filter mask was computed once for the whole table
+            scan = max(self.CHUNK_ROWS, limit - sent)
+            block = order[cursor:cursor + scan]
+            if mask is not None:
+                block = block[mask[block]]
+            block = block[:min(self.CHUNK_ROWS, limit - sent)]
+            if len(block) == 0:
+                cursor += scan
+                continue
+            rows = projected.iloc[block].to_json(orient="values", date_format="iso")
+            yield '{"rows": ' + rows + "}\n"
+            sent += len(block)
+            last_pos = int(block[-1])
+            cursor = int(rank[last_pos]) + 1
+
+        next_cursor = None
+        if last_pos is not None and cursor < total:
+            next_cursor = f"{token}.{last_pos}"
+        yield json.dumps({"row_count": sent, "next_cursor": next_cursor}) + "\n"
+
+    def _sort_order(self, table_name, df, sort):
+        """Returns the cached (order, rank) permutation pair for a sort spec on a loaded table."""
+        key = ("sort", table_name, tuple((s["column"], bool(s.get("desc"))) for s in sort))
+        cached = self._cache_get(key)
+        if cached is None:
+            cached = self._compute_order(df, sort)
+            self._cache_put(key, cached)
+        return cached
+
+    def _cached_mask(self, table_name, df, filters):
+        """Filter mask (1 byte per row) cached per filter spec, so later pages do not rescan the table."""
+        key = ("mask", table_name, json.dumps(filters, sort_keys=True, default=str))
+        mask = self._cache_get(key)
+        if mask is None:
+            mask = self._filter_mask(df, filters)
+            self._cache_put(key, mask)
+        return mask
+
+    def _compute_order(self, df, sort):
+        self._check_columns(df, [s["column"] for s in sort])
+        # int32 halves the cached permutations (8 B/row for the pair) for any table below 2**31 rows
+        dtype = np.int32 if len(df) < 2 ** 31 else np.int64
+        if not sort:
+            order = np.arange(len(df), dtype=dtype)
+        else:
+            # Stable lexsort (row position breaks ties); the last key is primary, so feed the spec reversed
+            order = np.lexsort([self._sort_codes(df[s["column"]], s.get("desc")) for s in reversed(sort)]).astype(dtype, copy=False)
+        # Inverse permutation: row position -> index in order, used to seek past a cursor
+        rank = np.empty_like(order)
+        rank[order] = np.arange(len(order), dtype=dtype)
+        return order, rank
+
+    def _sort_codes(self, series, desc=False):
+        try:
+            codes = series.rank(method="dense").to_numpy(dtype=float)
+        except TypeError:
+            # Mixed-type object columns: order by their string form
+            codes = series.astype(str).where(series.notnull()).rank(method="dense").to_numpy(dtype=float)
+        if desc:
+            codes = -codes
+        # Nulls always sort last
+        return np.where(np.isnan(codes), np.inf, codes)
+
+    def _seek(self, rank, cursor, token):
+        """Keyset seek: the cursor is ``<token>.<row position of the last row already returned>``."""
+        if cursor in (None, ""):
+            return 0
+        cursor_token, _, pos = str(cursor).partition(".")
+        try:
+            last_pos = int(pos)
+        except (TypeError, ValueError):
+            raise ValueError("Invalid cursor.")
+        if cursor_token != token:
+            raise ValueError("Cursor belongs to another query or an older version of the data; restart the query.")
+        if last_pos < 0 or last_pos >= len(rank):
+            raise ValueError("Cursor is out of range; restart the query.")
+        return int(rank[last_pos]) + 1
+
+    def _filter_mask(self, df, filters):
+        mask = np.ones(len(df), dtype=bool)
+        for f in filters:
+            col, op = f.get("column"), f.get("op", "eq")
+            self._check_columns(df, [col])
+            if op not in self.FILTER_OPS:
+                raise ValueError(f"Unsupported filter op '{op}'.")
+            mask &= self.FILTER_OPS[op](df[col], f.get("value")).fillna(False).to_numpy(dtype=bool)
+        return mask
+
+    def _grouped(self, table_name, df, spec):
+        """Computes (and caches) the aggregate frame; pages through it in group-key order."""
+        key = ("group", table_name, json.dumps({k: spec.get(k) for k in ("filters", "group_by", "aggregates", "sort")}, sort_keys=True, default=str))
+        cached = self._cache_get(key)
+        if cached is not None:
+            return cached
+
+        group_by = spec.get("group_by", [])
+        aggregates = spec.get("aggregates") or [{"column": group_by[0] if group_by else df.columns[0], "func": "count"}]
+        self._check_columns(df, group_by + [a["column"] for a in aggregates])
+        for a in aggregates:
+            if a.get("func") not in self.AGG_FUNCS:
+                raise ValueError(f"Unsupported aggregate '{a.get('func')}'.")
+
+        filtered = df[self._filter_mask(df, spec.get("filters", []))]
+        named = {f"{a['func']}_{a['column']}": pd.NamedAgg(column=a["column"], aggfunc=a["func"]) for a in aggregates}
+        if group_by:
+            result = filtered.groupby(group_by, dropna=False).agg(**named).reset_index()
+        else:
+            result = pd.DataFrame([{name: filtered[agg.column].agg(agg.aggfunc) for name, agg in named.items()}])
+
+        cached = (result,) + self._compute_order(result, spec.get("sort", []))
+        self._cache_put(key, cached)
+        return cached
+
+    def _check_columns(self, df, columns):
+        missing = [c for c in columns if c not in df.columns]
+        if missing:
+            raise ValueError(f"Unknown columns: {', '.join(map(str, missing))}")
+
+    @staticmethod
+    def _nbytes(value):
+        parts = value if isinstance(value, tuple) else (value,)
+        return int(sum(p.memory_usage(index=True).sum() if isinstance(p, pd.DataFrame) else p.nbytes for p in parts))
+
+    def _cache_get(self, key):
+        if key in self._cache:
+            self._cache.move_to_end(key)
+            return self._cache[key][0]
+        return None
+
+    def _cache_put(self, key, value):
+        """LRU insert; evicts until both CACHE_ENTRIES and CACHE_BYTES hold. Oversized values are not cached."""
+        nbytes = self._nbytes(value)
+        if nbytes > self.CACHE_BYTES:
+            return
+        if key in self._cache:
+            self._cache_bytes -= self._cache.pop(key)[1]
+        self._cache[key] = (value, nbytes)
+        self._cache_bytes += nbytes
+        while len(self._cache) > self.CACHE_ENTRIES or self._cache_bytes > self.CACHE_BYTES:
+            self._cache_bytes -= self._cache.popitem(last=False)[1][1]
@@ -0,0 +1,134 @@
+import time
+import random
+import threading
+import datetime
+from email.utils import parsedate_to_datetime
+
+
+class TokenBucket:
+    """Blocking client-side token bucket (per process).
+
+    AIService sizes it to this process's share of the project quota
+    (INSIGHTDB_AI_RPM / INSIGHTDB_AI_PROCESSES, set by gunicorn.conf.py).
+    Low-priority callers (background precompute) only take spare tokens: they wait
+    while anyone else is waiting and never dip into the reserved half of the burst.
+    """
+
+    def __init__(self, rate_per_minute, burst=None):
+        self.rate = rate_per_minute / 60.0
+        self.capacity = float(burst or max(1, int(rate_per_minute // 10)))
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.waiting = 0
+        self.waiting_low = 0
+        self.reserve = int(self.capacity // 2)
+        self._cond = threading.Condition()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def acquire(self, timeout=None, low_priority=False):
+        """Takes one token, waiting for the refill if needed. Returns False on timeout."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        needed = 1 + self.reserve if low_priority else 1
+        with self._cond:
+            self.waiting += 1
+            self.waiting_low += low_priority
+            try:
+                while True:
+                    self._refill()
+                    yields = low_priority and self.waiting > self.waiting_low
+                    if self.tokens >= needed and not yields:
+                        self.tokens -= 1
+                        return True
+                    # Yielding low-priority callers are woken by notify_all when a waiter leaves
+                    wait = (needed - self.tokens if self.tokens < needed else 1) / self.rate
+                    if deadline is not None:
+                        remaining = deadline - time.monotonic()
+                        if remaining <= 0:
+                            return False
+                        wait = min(wait, remaining)
+                    self._cond.wait(wait)
+            finally:
+                self.waiting -= 1
+                self.waiting_low -= low_priority
+                # A low-priority waiter may be parked behind us
+                self._cond.notify_all()
+
+    def penalize(self, seconds):
+        """Drains the bucket so nobody else calls upstream until the server's retry-after has passed."""
+        with self._cond:
+            self._refill()
+            self.tokens = min(self.tokens, -seconds * self.rate)
+
+
+class SingleFlight:
+    """Coalesces identical in-flight calls: concurrent callers with the same key share one result."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}
+        self.coalesced = 0
+
+    def do(self, key, fn):
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = {"event": threading.Event(), "result": None, "error": None}
+                self._calls[key] = call
+            else:
+                self.coalesced += 1
+
+        if not leader:
+            call["event"].wait()
+            if call["error"] is not None:
+                raise call["error"]
+            return call["result"]
+
+        try:
+            call["result"] = fn()
+            return call["result"]
+        except Exception as e:
+            call["error"] = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call["event"].set()
+
+    def in_flight(self):
+        with self._lock:
+            return len(self._calls)
+
+
+def parse_retry_after(response):
+    """Seconds to wait according to the server: Retry-After header or a Google RetryInfo detail."""
+    header = response.headers.get("Retry-After")
+    if header:
+        try:
+            return max(0.0, float(header))
+        except ValueError:
+            try:
+                when = parsedate_to_datetime(header)
+                return max(0.0, (when - datetime.datetime.now(when.tzinfo)).total_seconds())
+            except (TypeError, ValueError):
+                pass
+    try:
+        for detail in response.json().get("error", {}).get("details", []):
+            delay = detail.get("retryDelay")
+            if delay and delay.endswith("s"):
+                return max(0.0, float(delay[:-1]))
+    except (ValueError, AttributeError):
+        pass
+    return None
+
+
+def backoff_delay(attempt, retry_after=None, base=1.0, cap=60.0):
+    """Exponential backoff with jitter that never undercuts the server's retry-after hint."""
+    delay = min(cap, base * (2 ** attempt)) * (0.5 + random.random() / 2)
+    if retry_after is not None:
+        delay = max(delay, min(cap, retry_after))
+    return delay
@@ -0,0 +1,112 @@
+from collections import defaultdict, deque
+
+
+# Edges whose child rows match their parent less often than this are "broken branches"
+BROKEN_MATCH_RATE = 0.95
+
+
+def _cardinality(rel):
+    # Parent keys are the target's primary key (unique by construction), so a single FK edge is
+    # 1:1 or 1:N; N:M only arises through junction tables, see _many_to_many
+    return "1:N" if rel["max_children_per_parent"] > 1 else "1:1"
+
+
+def _many_to_many(edges):
+    """Parent pairs linked N:M through a junction table holding a 1:N FK to each of them."""
+    links = []
+    by_child = defaultdict(list)
+    for edge in edges:
+        if edge["cardinality"] == "1:N":
+            by_child[edge["source"]].append(edge)
+    for junction, fks in by_child.items():
+        for i, left in enumerate(fks):
+            for right in fks[i + 1:]:
+                if left["target"] == right["target"]:
+                    continue
+                links.append({
+                    "tables": [left["target"], right["target"]],
+                    "junction": junction,
+                    "columns": [left["column"], right["column"]],
+                    "cardinality": "N:M"
+                })
+    return links
+
+
+def _referrers_of(table, referrers):
+    """Tables whose joins run through ``table``: everything that references it, transitively."""
+    reached = {}
+    queue = deque([(table, 0)])
+    while queue:
+        current, depth = queue.popleft()
+        for child in referrers.get(current, ()):
+            if child != table and child not in reached:
+                reached[child] = depth + 1
+                queue.append((child, depth + 1))
+    return reached
+
+
+def build_relationship_graph(schemas, metrics, relationships):
+    """Builds the table relationship graph from the FK key-index stats of the quality pass.
+
+    Only precomputed artifacts are read, so this is cheap enough to rebuild whenever
+    trust scores change and never touches the raw data. Edges are FK -> primary key and
+    therefore 1:1 or 1:N; N:M relationships are reported separately, via their junction table.
+
+    :param schemas: Dictionary of {table_name: schema_dict} from SchemaAnalyzer
+    :param metrics: Dictionary of {table_name: metrics_dict} from QualityEngine
+    :param relationships: QualityEngine.relationships, {table_name: [FK edge stats]}
+    """
+    edges = []
+    referrers = defaultdict(set) # parent -> child tables
+    for child_table, rels in relationships.items():
+        for rel in rels:
+            child_rows = rel["child_rows"]
+            matched_rows = child_rows - rel["orphan_rows"]
+            edges.append({
+                "id": f"{child_table}.{rel['column']}->{rel['parent_table']}.{rel['parent_key']}",
+                "source": child_table,
+                "target": rel["parent_table"],
+                "column": rel["column"],
+                "parent_key": rel["parent_key"],
+                "cardinality": _cardinality(rel),
+                "orphan_rows": rel["orphan_rows"],
+                "orphan_keys": rel["orphan_keys"],
+                "child_match_rate": round(matched_rows / child_rows, 4) if child_rows else 1.0,
+                "parent_match_rate": round(rel["matched_parent_keys"] / rel["parent_keys"], 4) if rel["parent_keys"] else 1.0,
+                "avg_children_per_parent": round(matched_rows / rel["matched_parent_keys"], 2) if rel["matched_parent_keys"] else 0.0
+            })
+            referrers[rel["parent_table"]].add(child_table)
+
+    # Orphans in a child table also break every join path that goes through it
+    for edge in edges:
+        edge["broken"] = edge["child_match_rate"] < BROKEN_MATCH_RATE
+        reached = _referrers_of(edge["source"], referrers) if edge["orphan_rows"] else {}
+        edge["propagates_to"] = sorted(reached)
+        edge["propagation_depth"] = max(reached.values(), default=0)
+
+    broken_tables = {e["source"] for e in edges if e["broken"]}
+    for edge in edges:
+        if edge["broken"]:
+            broken_tables.update(edge["propagates_to"])
+
+    nodes = []
+    for table_name, schema in schemas.items():
+        nodes.append({
+            "id": table_name,
+            "row_count": schema.get("row_count", 0),
+            "trust_score": metrics.get(table_name, {}).get("trust_score"),
+            "primary_key": (schema.get("potential_keys") or [None])[0],
+            "on_broken_branch": table_name in broken_tables
+        })
+
+    return {
+        "nodes": nodes,
+        "edges": edges,
+        "many_to_many": _many_to_many(edges),
+        "summary": {
+            "tables": len(nodes),
+            "edges": len(edges),
+            "broken_edges": sum(1 for e in edges if e["broken"]),
+            "broken_threshold": BROKEN_MATCH_RATE
+        }
+    }
@@ -1,76 +1,97 @@
 import pandas as pd
+from pipeline import Pipeline, fingerprint
 
 class SchemaAnalyzer:
-    def __init__(self, tables):
+    def __init__(self, tables, pipeline=None):
         """
         :param tables: Dictionary of {table_name: pd.DataFrame}
+        :param pipeline: Shared memoization graph; tables whose content is unchanged are not re-analyzed
         """
         self.tables = tables
         self.schema = {}
+        self.pipeline = pipeline or Pipeline()
 
     def analyze(self):
         """analyzes all loaded tables and returns a schema dictionary."""
+        # FK inference looks at the other table names, so they are an input of every table's node
+        table_names = fingerprint(sorted(self.tables.keys()))
         for table_name, df in self.tables.items():
-            table_info = {
-                "name": table_name,
-                "row_count": len(df),
-                "columns": [],
-                "potential_keys": [],
-                "potential_foreign_keys": []
-            }
+            inputs = {"data": self.pipeline.table_hash(df), "table_names": table_names}
+            self.schema[table_name], _ = self.pipeline.node(
+                f"schema:{table_name}", inputs, lambda: self._analyze_table(table_name, df), table=table_name)
 
-            for col in df.columns:
-                col_type = str(df[col].dtype)
-                unique_count = df[col].nunique()
-                null_count = int(df[col].isnull().sum())
-                is_numeric = pd.api.types.is_numeric_dtype(df[col])
-                is_datetime = 'date' in col.lower() or 'time' in col.lower() or pd.api.types.is_datetime64_any_dtype(df[col])
-                
-                # Context-Aware Classification
-                classification = "other"
-                if col.endswith("_id") or col == "id":
-                    classification = "identifier"
-                elif is_datetime:
-                    classification = "timestamp"
-                elif is_numeric:
-                    classification = "numeric"
-                elif df[col].dtype == "object" and unique_count < 50:
-                    classification = "categorical"
-                
-                col_data = {
-                    "name": col,
-                    "type": col_type,
-                    "classification": classification,
-                    "unique_count": unique_count,
-                    "null_count": null_count
-                }
-                table_info["columns"].append(col_data)
+        return self.schema
 
-                # Potential Primary Key Inference
-                if classification == "identifier" and unique_count == len(df) and null_count == 0:
-                    table_info["potential_keys"].append(col)
+    def _analyze_table(self, table_name, df):
+        table_info = {
+            "name": table_name,
+            "row_count": len(df),
+            "columns": [],
+            "potential_keys": [],
+            "potential_foreign_keys": []
+        }
 
-                # Potential Foreign Key Inference
-                if classification == "identifier" and not (unique_count == len(df) and null_count == 0):
-                    # Look for targets: e.g. customer_id -> olist_customers_dataset
-                    # We strip 'olist_' and '_dataset' to match heuristics or just check substrings
-                    potential_targets = []
-                    for t in self.tables.keys():
-                        if t == table_name: continue
-                        clean_t = t.replace("olist_", "").replace("_dataset", "")
-                        clean_col = col.replace("_id", "")
-                        if clean_col in clean_t or clean_t in clean_col:
-                            potential_targets.append(t)
-                    
-                    if potential_targets:
-                         table_info["potential_foreign_keys"].append({
-                             "column": col,
-                             "suggested_tables": potential_targets
-                         })
+        for col in df.columns:
+            col_type = str(df[col].dtype)
+            unique_count = df[col].nunique()
+            null_count = int(df[col].isnull().sum())
+            is_numeric = pd.api.types.is_numeric_dtype(df[col])
+            is_datetime = 'date' in col.lower() or 'time' in col.lower() or pd.api.types.is_datetime64_any_dtype(df[col])
+            
+            # Context-Aware Classification
+            classification = "other"
+            if col.endswith("_id") or col == "id":
+                classification = "identifier"
+            elif is_datetime:
+                classification = "timestamp"
+            elif is_numeric:
+                classification = "numeric"
+            elif (pd.api.types.is_object_dtype(df[col]) or pd.api.types.is_string_dtype(df[col])) and unique_count < 50:
+                classification = "categorical"
+            
+            col_data = {
+                "name": col,
+                "type": col_type,
+                "classification": classification,
+                "unique_count": unique_count,
+                "null_count": null_count
+            }
+            if is_numeric and not pd.api.types.is_bool_dtype(df[col]):
+                # Cheap profile used by the local policy inferencer
+                series = df[col].dropna()
+                if not series.empty:
+                    col_data.update({
+                        "min": float(series.min()),
+                        "max": float(series.max()),
+                        "mean": float(series.mean()),
+                        "negative_count": int((series < 0).sum()),
+                        "non_null_count": int(len(series))
+                    })
+            table_info["columns"].append(col_data)
 
-            self.schema[table_name] = table_info
+            # Potential Primary Key Inference
+            if classification == "identifier" and unique_count == len(df) and null_count == 0:
+                table_info["potential_keys"].append(col)
 
-        return self.schema
+            # Potential Foreign Key Inference
+            if classification == "identifier" and not (unique_count == len(df) and null_count == 0):
+                # Look for targets: e.g. customer_id -> olist_customers_dataset
+                # We strip 'olist_' and '_dataset' to match heuristics or just check substrings
+                potential_targets = []
+                for t in self.tables.keys():
+                    if t == table_name: continue
+                    clean_t = t.replace("olist_", "").replace("_dataset", "")
+                    clean_col = col.replace("_id", "")
+                    if clean_col in clean_t or clean_t in clean_col:
+                        potential_targets.append(t)
+                
+                if potential_targets:
+                     table_info["potential_foreign_keys"].append({
+                         "column": col,
+                         "suggested_tables": potential_targets
+                     })
+
+        return table_info
 
     def get_table_schema(self, table_name):
         return self.schema.get(table_name)
@@ -0,0 +1,124 @@
+import re
+import math
+from collections import Counter
+
+
+def estimate_tokens(text):
+    """Cheap token estimate (~4 characters per token), good enough for budgeting prompts."""
+    return max(1, math.ceil(len(text) / 4))
+
+
+def _terms(text):
+    # Split snake_case / camelCase / punctuation, lowercase, and strip a plural 's'
+    words = re.findall(r"[A-Za-z][a-z]*|[0-9]+", re.sub(r"[_\W]+", " ", str(text)))
+    terms = []
+    for w in words:
+        w = w.lower()
+        if len(w) > 4 and w.endswith("ies"):
+            w = w[:-3] + "y"
+        elif len(w) > 3 and w.endswith("s") and not w.endswith("ss"):
+            w = w[:-1]
+        terms.append(w)
+    return terms
+
+
+class SchemaContext:
+    """Compact, cached schema digest plus a lexical index used to pick chat context.
+
+    Build one per workspace version; select() then returns only the tables and
+    columns relevant to a question, trimmed to a token budget.
+    """
+
+    TABLE_NAME_WEIGHT = 3.0
+    # Noise prefixes/suffixes in dataset names that carry no meaning for retrieval
+    STOP_TERMS = {"olist", "dataset", "id", "the", "a", "an", "of", "in", "is", "what", "which", "how", "many", "are", "do", "does", "and", "or", "to", "for", "with", "my", "me"}
+
+    def __init__(self, schema, trust_scores=None):
+        """
+        :param schema: Dictionary of {table_name: schema_dict} from SchemaAnalyzer
+        :param trust_scores: Optional {table_name: trust_score}
+        """
+        self.schema = schema
+        self.trust_scores = trust_scores or {}
+        self.digests = {}
+        self.column_digests = {}
+        self._postings = {}
+        self._doc_freq = Counter()
+        self._build()
+
+    def _build(self):
+        for name, info in self.schema.items():
+            cols = info.get("columns", [])
+            col_parts = {c["name"]: f"{c['name']}:{c.get('classification', c.get('type'))}" for c in cols}
+            header = f"{name} (rows={info.get('row_count', 0)}"
+            if name in self.trust_scores:
+                header += f", trust={self.trust_scores[name]}"
+            if info.get("potential_keys"):
+                header += f", pk={','.join(info['potential_keys'])}"
+            fks = [f"{fk['column']}->{fk['suggested_tables'][0]}" for fk in info.get("potential_foreign_keys", []) if fk.get("suggested_tables")]
+            if fks:
+                header += f", fk={';'.join(fks)}"
+            header += ")"
+            self.digests[name] = f"{header}: {', '.join(col_parts.values())}"
+            self.column_digests[name] = (header, col_parts)
+
+            # Term -> weight for the table, and term -> columns for column-level pruning
+            weights = Counter()
+            col_terms = {}
+            for term in _terms(name):
+                if term not in self.STOP_TERMS:
+                    weights[term] += self.TABLE_NAME_WEIGHT
+            for c in cols:
+                terms = [t for t in _terms(c["name"]) if t not in self.STOP_TERMS]
+                col_terms[c["name"]] = set(terms)
+                for term in terms:
+                    weights[term] += 1.0
+            self._postings[name] = (weights, col_terms)
+            for term in weights:
+                self._doc_freq[term] += 1
+
+    def score(self, question):
+        """Ranks tables by a TF-IDF style overlap between question terms and table/column names."""
+        q_terms = {t for t in _terms(question) if t not in self.STOP_TERMS}
+        n_docs = max(1, len(self._postings))
+        scores = {}
+        for name, (weights, _) in self._postings.items():
+            score = 0.0
+            for term in q_terms:
+                if term in weights:
+                    idf = math.log(1 + n_docs / self._doc_freq[term])
+                    score += weights[term] * idf
+            scores[name] = score
+        # Unmatched tables go last, biggest first, so generic questions still get the main tables
+        return q_terms, sorted(scores.items(), key=lambda kv: (-kv[1], -self.schema[kv[0]].get("row_count", 0), kv[0]))
+
+    def select(self, question, budget_tokens):
+        """Returns (context_text, info) with the most relevant schema that fits in budget_tokens."""
+        q_terms, ranked = self.score(question)
+        lines = []
+        used = 0
+        included = []
+
+        for name, score in ranked:
+            line = self.digests[name]
+            if used + estimate_tokens(line) > budget_tokens:
+                # Fall back to the keys and the columns the question actually mentions
+                header, col_parts = self.column_digests[name]
+                _, col_terms = self._postings[name]
+                matched = [part for col, part in col_parts.items() if col_terms.get(col, set()) & q_terms]
+                line = f"{header}: {', '.join(matched)}" if matched else header
+                if used + estimate_tokens(line) > budget_tokens:
+                    continue
+            lines.append(line)
+            used += estimate_tokens(line)
+            included.append(name)
+
+        # Always list the remaining tables by name so the model knows what else exists
+        others = [name for name, _ in ranked if name not in included]
+        if others:
+            line = "Other tables: " + ", ".join(others)
+            if used + estimate_tokens(line) <= budget_tokens:
+                lines.append(line)
+                used += estimate_tokens(line)
+
+        return "\n".join(lines), {"tables": included, "context_tokens": used, "budget_tokens": budget_tokens}
@@ -0,0 +1,249 @@
+import os
+import json
+import time
+import shutil
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:  # Windows dev server: single process, nothing to serialize against
+    fcntl = None
+
+# pyarrow is imported where tables are read or written: checking the CURRENT pointer on
+# every request must not pay for it
+
+
+def _json_default(obj):
+    # numpy scalars leak into metrics (counts, rounded rates); unwrap them for JSON
+    if hasattr(obj, "item"):
+        return obj.item()
+    return str(obj)
+
+
+class SnapshotTables:
+    """Read-only, dict-like view over the Arrow files of one published snapshot.
+
+    Each table is memory-mapped and only converted to pandas on first access, so
+    every worker shares the same page cache instead of holding its own copy.
+    """
+
+    def __init__(self, version_dir, table_names, tables_version=None):
+        self.version_dir = version_dir
+        # Version that first published these tables; artifact-only republishes keep it
+        self.tables_version = tables_version
+        self._names = list(table_names)
+        self._arrow = {}
+        self._frames = {}
+
+    def arrow(self, table_name):
+        if table_name not in self._arrow:
+            import pyarrow as pa
+            import pyarrow.ipc
+            path = os.path.join(self.version_dir, "tables", f"{table_name}.arrow")
+            source = pa.memory_map(path, "r")
+            self._arrow[table_name] = pa.ipc.open_file(source).read_all()
+        return self._arrow[table_name]
+
+    def __getitem__(self, table_name):
+        if table_name not in self._names:
+            raise KeyError(table_name)
+        if table_name not in self._frames:
+            # split_blocks keeps null-free numeric columns as views on the mapped buffers
+            self._frames[table_name] = self.arrow(table_name).to_pandas(split_blocks=True)
+        return self._frames[table_name]
+
+    def get(self, table_name, default=None):
+        try:
+            return self[table_name]
+        except KeyError:
+            return default
+
+    def __contains__(self, table_name):
+        return table_name in self._names
+
+    def __iter__(self):
+        return iter(self._names)
+
+    def __len__(self):
+        return len(self._names)
+
+    def keys(self):
+        return list(self._names)
+
+    def values(self):
+        return [self[name] for name in self._names]
+
+    def items(self):
+        return [(name, self[name]) for name in self._names]
+
+
+class SnapshotStore:
+    """Publishes analyzed tables and artifacts as immutable, versioned snapshots.
+
+    Layout under ``root``::
+
+        CURRENT                 -> name of the live version directory ("" after a reset)
+        <version>/tables/*.arrow
+        <version>/artifacts.json
+        <version>/TABLES_VERSION  -> version that first published these tables
+
+    Writers build a new version directory and then atomically replace ``CURRENT``.
+    Readers (any worker process) compare ``CURRENT`` with the version they hold and
+    reload when it changes, which is the only notification mechanism needed.
+    """
+
+    # Uploads are kept whole: an upload publishes several versions (tables, refined artifacts,
+    # docs) that share its tables, and workers may still be mapping any of them
+    KEEP_TABLE_VERSIONS = 2
+
+    def __init__(self, root):
+        self.root = root
+        self.pointer_path = os.path.join(root, "CURRENT")
+        self.lock_path = os.path.join(root, ".lock")
+        os.makedirs(root, exist_ok=True)
+
+    @contextmanager
+    def _pointer_lock(self):
+        """Serializes pointer updates across worker processes."""
+        if fcntl is None:
+            yield
+            return
+        with open(self.lock_path, "a") as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def current_version(self):
+        """Returns the live version name, "" after a reset, or None if nothing was ever published."""
+        try:
+            with open(self.pointer_path) as f:
+                return f.read().strip()
+        except FileNotFoundError:
+            return None
+
+    def publish(self, tables, artifacts):
+        """Writes a new snapshot of ``tables`` (name -> DataFrame) plus JSON ``artifacts``."""
+        version, tmp_dir = self._new_version_dir()
+        tables_dir = os.path.join(tmp_dir, "tables")
+        os.makedirs(tables_dir)
+        for table_name, df in tables.items():
+            self._write_table(os.path.join(tables_dir, f"{table_name}.arrow"), df)
+        self._write_artifacts(tmp_dir, list(tables.keys()), artifacts, tables_version=version)
+        with self._pointer_lock():
+            return self._activate(version, tmp_dir)
+
+    def publish_artifacts(self, updates, base_version):
+        """Publishes a new version that reuses the tables of ``base_version`` and merges ``updates`` into its artifacts.
+
+        Returns None without publishing if ``base_version`` is no longer live, e.g. another
+        worker published a new upload while this one was still waiting for AI results.
+        """
+        with self._pointer_lock():
+            current = self.current_version()
+            if not current or current != base_version:
+                return None
+            return self._publish_over(current, updates)
+
+    def _publish_over(self, current, updates):
+        current_dir = os.path.join(self.root, current)
+        manifest = self._read_manifest(current_dir)
+        artifacts = dict(manifest["artifacts"])
+        artifacts.update(updates)
+
+        version, tmp_dir = self._new_version_dir()
+        tables_dir = os.path.join(tmp_dir, "tables")
+        os.makedirs(tables_dir)
+        for table_name in manifest["tables"]:
+            src = os.path.join(current_dir, "tables", f"{table_name}.arrow")
+            dst = os.path.join(tables_dir, f"{table_name}.arrow")
+            try:
+                os.link(src, dst)  # tables are immutable, share the inode
+            except OSError:
+                shutil.copyfile(src, dst)
+        self._write_artifacts(tmp_dir, manifest["tables"], artifacts, tables_version=manifest.get("tables_version", current))
+        return self._activate(version, tmp_dir)
+
+    def clear(self):
+        """Marks the store as empty so every worker drops its state."""
+        with self._pointer_lock():
+            self._write_pointer("")
+            self._prune(keep=None)
+
+    def load(self, version):
+        """Returns (SnapshotTables, artifacts) for a published version."""
+        version_dir = os.path.join(self.root, version)
+        manifest = self._read_manifest(version_dir)
+        tables = SnapshotTables(version_dir, manifest["tables"], tables_version=manifest.get("tables_version", version))
+        return tables, manifest["artifacts"]
+
+    def _new_version_dir(self):
+        version = f"v{time.time_ns()}-{os.getpid()}"
+        tmp_dir = os.path.join(self.root, f".{version}.tmp")
+        os.makedirs(tmp_dir)
+        return version, tmp_dir
+
+    def _activate(self, version, tmp_dir):
+        os.rename(tmp_dir, os.path.join(self.root, version))
+        self._write_pointer(version)
+        self._prune(keep=version)
+        return version
+
+    def _write_pointer(self, version):
+        tmp_pointer = f"{self.pointer_path}.{os.getpid()}.tmp"
+        with open(tmp_pointer, "w") as f:
+            f.write(version)
+        os.replace(tmp_pointer, self.pointer_path)
+
+    def _write_table(self, path, df):
+        import pyarrow as pa
+        import pyarrow.ipc
+        try:
+            table = pa.Table.from_pandas(df, preserve_index=False)
+        except (pa.ArrowInvalid, pa.ArrowTypeError):
+            # Mixed-type object columns: store them as strings rather than failing the publish
+            df = df.copy()
+            for col in df.select_dtypes(include="object").columns:
+                df[col] = df[col].where(df[col].isnull(), df[col].astype(str))
+            table = pa.Table.from_pandas(df, preserve_index=False)
+        with pa.OSFile(path, "wb") as sink:
+            with pa.ipc.new_file(sink, table.schema) as writer:
+                writer.write_table(table)
+
+    def _write_artifacts(self, version_dir, table_names, artifacts, tables_version):
+        with open(os.path.join(version_dir, "artifacts.json"), "w") as f:
+            json.dump({"tables": table_names, "tables_version": tables_version, "artifacts": artifacts}, f, default=_json_default)
+        # Small sidecar so pruning does not have to parse every manifest
+        with open(os.path.join(version_dir, "TABLES_VERSION"), "w") as f:
+            f.write(tables_version)
+
+    def _tables_version_of(self, version):
+        try:
+            with open(os.path.join(self.root, version, "TABLES_VERSION")) as f:
+                return f.read().strip()
+        except FileNotFoundError:
+            return version  # written before the sidecar existed
+
+    def _read_manifest(self, version_dir):
+        with open(os.path.join(version_dir, "artifacts.json")) as f:
+            return json.load(f)
+
+    def _prune(self, keep):
+        # Keep every version of the last few uploads: workers may still be mapping the previous one.
+        versions = sorted(
+            (d for d in os.listdir(self.root) if d.startswith("v")),
+            key=lambda d: int(d[1:].split("-")[0]),
+        )
+        if keep is None:
+            stale = versions
+        else:
+            tables_versions = {v: self._tables_version_of(v) for v in versions}
+            recent = []
+            for v in reversed(versions):
+                if tables_versions[v] not in recent:
+                    recent.append(tables_versions[v])
+            live = set(recent[:self.KEEP_TABLE_VERSIONS]) | {tables_versions.get(keep, keep)}
+            stale = [v for v in versions if tables_versions[v] not in live]
+        for v in stale:
+            shutil.rmtree(os.path.join(self.root, v), ignore_errors=True)
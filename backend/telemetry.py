@@ -0,0 +1,223 @@
+import os
+import json
+import time
+import queue
+import atexit
+import logging
+import threading
+import datetime
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line; extra fields passed as ``extra={"fields": {...}}`` are merged in."""
+
+    def format(self, record):
+        entry = {
+            "ts": datetime.datetime.fromtimestamp(record.created).isoformat(),
+            "level": record.levelname,
+            "msg": record.getMessage(),
+        }
+        entry.update(getattr(record, "fields", {}))
+        return json.dumps(entry, default=str)
+
+
+_loggers = {}
+_loggers_lock = threading.Lock()
+
+
+def _process_log_file(log_file):
+    """Per-worker file name under gunicorn: RotatingFileHandler rollover is not safe across processes."""
+    if int(os.environ.get("INSIGHTDB_AI_PROCESSES", 1)) <= 1:
+        return log_file
+    root, ext = os.path.splitext(log_file)
+    return f"{root}.{os.getpid()}{ext}"
+
+
+def get_logger(log_file, max_bytes=5 * 1024 * 1024, backup_count=5):
+    """Returns a logger whose records are queued on the calling thread and written by a background listener.
+
+    The file is rotated at ``max_bytes``. One listener is shared per log file; with several
+    workers each one writes ``<name>.<pid>.log`` so rollovers never clobber each other.
+    """
+    log_file = _process_log_file(log_file)
+    with _loggers_lock:
+        if log_file in _loggers:
+            return _loggers[log_file]
+
+        file_handler = RotatingFileHandler(log_file, maxBytes=max_bytes, backupCount=backup_count, encoding="utf-8")
+        file_handler.setFormatter(JsonFormatter())
+        log_queue = queue.SimpleQueue()
+        listener = QueueListener(log_queue, file_handler, respect_handler_level=False)
+        listener.start()
+        atexit.register(listener.stop)  # flush what is still queued on shutdown
+
+        logger = logging.getLogger(f"insightdb.{log_file}")
+        logger.setLevel(logging.INFO)
+        logger.propagate = False
+        logger.addHandler(QueueHandler(log_queue))
+        _loggers[log_file] = logger
+        return logger
+
+
+class Telemetry:
+    """Aggregates for AI calls: counters, token totals and latency histograms.
+
+    Each process keeps its own counters. When ``shared_dir`` is set (gunicorn.conf.py
+    exports INSIGHTDB_TELEMETRY_DIR), every process also writes them to
+    ``<shared_dir>/<pid>.json`` and scrapes merge all those files, so /metrics reports
+    the same monotonic totals whichever worker answers. Files of exited workers are
+    kept for the same reason; the directory is per gunicorn master.
+
+    Scrape with snapshot() (JSON) or render_prometheus() (text exposition format).
+    """
+
+    LATENCY_BUCKETS_MS = (50, 100, 250, 500, 1000, 2500, 5000, 10000, 30000, 60000)
+    # Client disconnects; neither a success nor an upstream error
+    CANCELLED = "cancelled"
+
+    def __init__(self, shared_dir=None):
+        self._lock = threading.Lock()
+        self.shared_dir = shared_dir
+        self._state = self._empty_state()
+        if shared_dir:
+            os.makedirs(shared_dir, exist_ok=True)
+
+    @classmethod
+    def _empty_state(cls):
+        return {
+            "started": time.time(),
+            "calls": {},        # operation -> {status: count}
+            "errors": {},       # operation -> count
+            "cancelled": {},    # operation -> count
+            "cache_hits": {},   # operation -> count
+            "tokens": {},       # direction -> count
+            "latency": {},      # operation -> {"buckets": [...], "sum": ms, "count": n}
+        }
+
+    def record(self, operation, status, latency_ms=None, prompt_tokens=None, response_tokens=None, cache_hit=False):
+        with self._lock:
+            state = self._state
+            by_status = state["calls"].setdefault(operation, {})
+            by_status[str(status)] = by_status.get(str(status), 0) + 1
+            if cache_hit:
+                self._bump(state["cache_hits"], operation)
+            elif status == self.CANCELLED:
+                self._bump(state["cancelled"], operation)
+            else:
+                if not (isinstance(status, int) and status < 400):
+                    self._bump(state["errors"], operation)
+                self._bump(state["tokens"], "prompt", prompt_tokens or 0)
+                self._bump(state["tokens"], "response", response_tokens or 0)
+                if latency_ms is not None:
+                    latency = state["latency"].setdefault(operation, {"buckets": [0] * len(self.LATENCY_BUCKETS_MS), "sum": 0.0, "count": 0})
+                    for i, bound in enumerate(self.LATENCY_BUCKETS_MS):
+                        if latency_ms <= bound:
+                            latency["buckets"][i] += 1
+                    latency["sum"] += latency_ms
+                    latency["count"] += 1
+            payload = json.dumps(state) if self.shared_dir else None
+        if payload is not None:
+            self._write_shared(payload)
+
+    @staticmethod
+    def _bump(counter, key, n=1):
+        counter[key] = counter.get(key, 0) + n
+
+    def _write_shared(self, payload):
+        path = os.path.join(self.shared_dir, f"{os.getpid()}.json")
+        tmp_path = f"{path}.tmp"
+        try:
+            with open(tmp_path, "w") as f:
+                f.write(payload)
+            os.replace(tmp_path, path)
+        except OSError:
+            pass  # telemetry must never fail an AI call
+
+    def _merged(self):
+        """(state summed over every worker, number of workers merged)."""
+        with self._lock:
+            own = json.loads(json.dumps(self._state))
+        if not self.shared_dir:
+            return own, 1
+        states = {os.getpid(): own}
+        try:
+            names = os.listdir(self.shared_dir)
+        except OSError:
+            names = []
+        for name in names:
+            pid, ext = os.path.splitext(name)
+            if ext != ".json" or not pid.isdigit() or int(pid) == os.getpid():
+                continue
+            try:
+                with open(os.path.join(self.shared_dir, name)) as f:
+                    states[int(pid)] = json.load(f)
+            except (OSError, ValueError):
+                continue
+
+        merged = self._empty_state()
+        merged["started"] = min(s.get("started", own["started"]) for s in states.values())
+        for state in states.values():
+            for op, by_status in state["calls"].items():
+                for status, n in by_status.items():
+                    self._bump(merged["calls"].setdefault(op, {}), status, n)
+            for key in ("errors", "cancelled", "cache_hits", "tokens"):
+                for name, n in state[key].items():
+                    self._bump(merged[key], name, n)
+            for op, latency in state["latency"].items():
+                total = merged["latency"].setdefault(op, {"buckets": [0] * len(self.LATENCY_BUCKETS_MS), "sum": 0.0, "count": 0})
+                total["buckets"] = [a + b for a, b in zip(total["buckets"], latency["buckets"])]
+                total["sum"] += latency["sum"]
+                total["count"] += latency["count"]
+        return merged, len(states)
+
+    def snapshot(self):
+        state, workers = self._merged()
+        result = {"uptime_s": round(time.time() - state["started"], 1), "workers": workers, "tokens": state["tokens"], "operations": {}}
+        for op in sorted(state["calls"]):
+            by_status = state["calls"][op]
+            cache_hits = state["cache_hits"].get(op, 0)
+            cancelled = state["cancelled"].get(op, 0)
+            errors = state["errors"].get(op, 0)
+            upstream = sum(by_status.values()) - cache_hits - cancelled
+            latency = state["latency"].get(op, {"buckets": [0] * len(self.LATENCY_BUCKETS_MS), "sum": 0.0, "count": 0})
+            count = latency["count"]
+            result["operations"][op] = {
+                "calls": by_status,
+                "cache_hits": cache_hits,
+                "cancelled": cancelled,
+                "errors": errors,
+                "error_rate": round(errors / upstream, 4) if upstream else 0.0,
+                "latency_ms": {
+                    "count": count,
+                    "avg": round(latency["sum"] / count, 1) if count else None,
+                    "buckets": {str(b): n for b, n in zip(self.LATENCY_BUCKETS_MS, latency["buckets"])},
+                },
+            }
+        return result
+
+    def render_prometheus(self):
+        state, _ = self._merged()
+        lines = ["# TYPE insightdb_ai_calls_total counter"]
+        for op in sorted(state["calls"]):
+            for status, n in sorted(state["calls"][op].items()):
+                lines.append(f'insightdb_ai_calls_total{{operation="{op}",status="{status}"}} {n}')
+        for name, key in (("errors", "errors"), ("cancelled", "cancelled"), ("cache_hits", "cache_hits")):
+            lines.append(f"# TYPE insightdb_ai_{name}_total counter")
+            for op, n in sorted(state[key].items()):
+                lines.append(f'insightdb_ai_{name}_total{{operation="{op}"}} {n}')
+        lines.append("# TYPE insightdb_ai_tokens_total counter")
+        for direction, n in sorted(state["tokens"].items()):
+            lines.append(f'insightdb_ai_tokens_total{{direction="{direction}"}} {n}')
+        lines.append("# TYPE insightdb_ai_latency_ms histogram")
+        for op, latency in sorted(state["latency"].items()):
+            for bound, n in zip(self.LATENCY_BUCKETS_MS, latency["buckets"]):
+                lines.append(f'insightdb_ai_latency_ms_bucket{{operation="{op}",le="{bound}"}} {n}')
+            lines.append(f'insightdb_ai_latency_ms_bucket{{operation="{op}",le="+Inf"}} {latency["count"]}')
+            lines.append(f'insightdb_ai_latency_ms_sum{{operation="{op}"}} {round(latency["sum"], 1)}')
+            lines.append(f'insightdb_ai_latency_ms_count{{operation="{op}"}} {latency["count"]}')
+        return "\n".join(lines) + "\n"
+
+
+# Process-wide aggregates; outlives AIService instances that are recreated on reset
+TELEMETRY = Telemetry(os.environ.get("INSIGHTDB_TELEMETRY_DIR"))
@@ -0,0 +1,85 @@
+import os
+import sys
+import tempfile
+
+import pytest
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+# app.py reads these at import time; keep test runs away from the real snapshot dir and LLM cache
+_scratch = tempfile.mkdtemp(prefix="insightdb-tests-")
+os.environ.setdefault("INSIGHTDB_SNAPSHOT_DIR", os.path.join(_scratch, "snapshots"))
+os.environ.setdefault("INSIGHTDB_LLM_CACHE", os.path.join(_scratch, "llm_cache.sqlite3"))
+os.environ["INSIGHTDB_PRECOMPUTE_OUTLIERS"] = "0"
+# AIService writes gemini_api*.log relative to the working directory
+os.chdir(_scratch)
+
+
+@pytest.fixture
+def write_csvs(tmp_path):
+    """Writes {name: DataFrame} as CSVs into a fresh directory and returns its path."""
+    def write(frames, directory=None):
+        directory = directory or tmp_path / "data"
+        directory.mkdir(parents=True, exist_ok=True)
+        for name, df in frames.items():
+            df.to_csv(directory / f"{name}.csv", index=False)
+        return directory
+    return write
+
+
+@pytest.fixture
+def ai_service(tmp_path, monkeypatch):
+    """AIService with its own response cache and no outbound calls unless a test stubs them."""
+    from ai_service import AIService
+
+    monkeypatch.setenv("INSIGHTDB_LLM_CACHE", str(tmp_path / "llm_cache.sqlite3"))
+    service = AIService()
+    monkeypatch.setattr(service, "_get_auth_headers", lambda: None)
+    yield service
+    service.close()
+
+
+@pytest.fixture
+def mock_vertex(monkeypatch):
+    """Runs mock_vertex.py on an ephemeral port and points AIService at it.
+
+    Returns the mock's settings (fail_first, retry_after, delay, chunk_delay; change them
+    before calling); ``requests`` is the number of requests the mock has received.
+    """
+    import argparse
+    import threading
+    from http.server import ThreadingHTTPServer
+    import mock_vertex as mock
+
+    class Settings(argparse.Namespace):
+        @property
+        def requests(self):
+            return mock.state["requests"]
+
+    settings = Settings(fail_first=0, retry_after=0.5, delay=0.0, chunk_delay=0.0)
+    monkeypatch.setattr(mock, "args", settings)
+    monkeypatch.setattr(mock, "state", {"requests": 0, "lock": threading.Lock()})
+    server = ThreadingHTTPServer(("127.0.0.1", 0), mock.MockVertexHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    monkeypatch.setenv("INSIGHTDB_VERTEX_BASE_URL", f"http://127.0.0.1:{server.server_address[1]}")
+    # Never pick up a real service account key during tests
+    monkeypatch.setattr("ai_service.AIService._load_credentials", lambda self: None)
+    yield settings
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def client(tmp_path, monkeypatch):
+    """Flask test client with uploads in a temp dir and no outbound AI calls."""
+    import app as app_module
+    from ai_service import AIService
+
+    uploads = tmp_path / "uploads"
+    uploads.mkdir()
+    monkeypatch.setattr(app_module, "UPLOAD_FOLDER", str(uploads))
+    monkeypatch.setattr(AIService, "_get_auth_headers", lambda self: None)
+    test_client = app_module.app.test_client()
+    yield test_client
+    test_client.post("/api/reset")
@@ -0,0 +1,67 @@
+import json
+
+import pytest
+
+
+def _item(column, row_index, value, **row):
+    row = dict(row, **{column: value})
+    return {"column": column, "row_index": row_index, "value": value, "z": 4.2, "row": row, "related": {}}
+
+
+@pytest.fixture
+def model_calls(ai_service, monkeypatch):
+    """Stubs the upstream call: every outlier in a grouped prompt gets a reason naming its column."""
+    prompts = []
+
+    def fake_call(prompt, is_json=False, usage=None, operation="generate"):
+        prompts.append(prompt)
+        rows = json.loads(prompt.split("Outliers: ", 1)[1].splitlines()[0])
+        return json.dumps({"explanations": [{"id": r["id"], "reason": f"{r['column']} is extreme"} for r in rows]})
+
+    monkeypatch.setattr(ai_service, "_call_gemini_rest", fake_call)
+    return prompts
+
+
+def test_explain_outliers_batch_groups_prompts_and_caches_per_row(ai_service, model_calls):
+    items = [_item("price", i, 1000 + i, order_id=i) for i in range(5)]
+
+    results = ai_service.explain_outliers_batch("orders", items, {"price": {"percentiles": {"p50": 10}}}, group_size=2)
+
+    assert len(model_calls) == 3
+    assert [r["row_index"] for r in results] == [0, 1, 2, 3, 4]
+    assert all(r["reason"] == "price is extreme" and not r["cached"] for r in results)
+
+    again = ai_service.explain_outliers_batch("orders", items, {}, group_size=2)
+    assert len(model_calls) == 3
+    assert all(r["cached"] for r in again)
+
+
+def test_outlier_cache_key_follows_row_contents(ai_service, model_calls):
+    ai_service.explain_outliers_batch("orders", [_item("price", 0, 1000, order_id=0, status="ok")], {})
+
+    # Same value, but another column of the row changed: the explanation is not reused
+    results = ai_service.explain_outliers_batch("orders", [_item("price", 0, 1000, order_id=0, status="late")], {})
+    assert len(model_calls) == 2
+    assert not results[0]["cached"]
+    assert ai_service.reason_outliers("orders", "price", {"order_id": 0, "status": "late", "price": 1000}, 1000) == "price is extreme"
+
+
+def test_unparseable_batch_answer_falls_back_without_caching(ai_service, monkeypatch):
+    monkeypatch.setattr(ai_service, "_call_gemini_rest", lambda *args, **kwargs: "not json")
+    results = ai_service.explain_outliers_batch("orders", [_item("price", 0, 1000)], {})
+
+    assert results[0]["reason"] == "Outlier detected via statistical Z-score."
+    assert ai_service.cache.stats()["entries"] == 0
+
+
+def test_cancel_background_drops_queued_jobs(ai_service):
+    import threading
+
+    release = threading.Event()
+    running = ai_service.submit_background(release.wait)
+    queued = ai_service.submit_background(lambda: "stale precompute")
+    ai_service.cancel_background()
+    release.set()
+
+    assert running.result(timeout=5)
+    assert queued.cancelled()
@@ -0,0 +1,158 @@
+import io
+import json
+
+import numpy as np
+import pandas as pd
+
+
+def _csv_upload(frames, append=False):
+    files = [(io.BytesIO(df.to_csv(index=False).encode("utf-8")), f"{name}.csv") for name, df in frames.items()]
+    return {"files": files, "append": "true" if append else "false"}
+
+
+def test_upload_with_bool_column(client):
+    frames = {"flags": pd.DataFrame({"flag_id": range(50), "active": [True] * 49 + [False], "score": range(50)})}
+    r = client.post("/api/upload", data=_csv_upload(frames), content_type="multipart/form-data")
+
+    assert r.status_code == 200, r.get_json()
+    assert r.get_json()["tables"] == ["flags"]
+    dist = client.get("/api/distribution/flags/active").get_json()
+    assert dist["kind"] == "numeric"
+
+
+def test_append_upload_after_adopting_snapshot(client):
+    import app as app_module
+
+    first = {"customers": pd.DataFrame({"customer_id": range(10), "city": ["x"] * 10})}
+    assert client.post("/api/upload", data=_csv_upload(first), content_type="multipart/form-data").status_code == 200
+
+    # Simulate a worker that did not publish: it adopts the snapshot as a read-only view on its next request
+    app_module.loaded_version = None
+    assert client.get("/api/schema").status_code == 200
+    assert not isinstance(app_module.data_loader.tables, dict)
+
+    second = {"orders": pd.DataFrame({"order_id": range(5), "customer_id": [0, 1, 2, 3, 99]})}
+    r = client.post("/api/upload", data=_csv_upload(second, append=True), content_type="multipart/form-data")
+
+    assert r.status_code == 200
+    assert sorted(r.get_json()["tables"]) == ["customers", "orders"]
+    assert sorted(client.get("/api/schema").get_json()) == ["customers", "orders"]
+
+
+def test_chat_rejects_bad_context_budget(client):
+    for budget in ("lots", -5, [1]):
+        r = client.post("/api/chat", json={"question": "which tables?", "context_budget": budget})
+        assert r.status_code == 400, budget
+        assert "context_budget" in r.get_json()["error"]
+
+
+def test_chat_accepts_numeric_string_budget(client):
+    frames = {"customers": pd.DataFrame({"customer_id": range(5), "city": ["x"] * 5})}
+    client.post("/api/upload", data=_csv_upload(frames), content_type="multipart/form-data")
+
+    r = client.post("/api/chat", json={"question": "which tables?", "context_budget": "500"})
+    assert r.status_code == 200
+    assert r.get_json()["usage"]["budget_tokens"] == 500
+
+
+def test_query_route_maps_bad_sort_to_400_and_unknown_table_to_404(client):
+    frames = {"orders": pd.DataFrame({"order_id": range(20), "price": np.arange(20) * 1.5})}
+    client.post("/api/upload", data=_csv_upload(frames), content_type="multipart/form-data")
+
+    assert client.post("/api/query/orders", json={"sort": [{"desc": True}]}).status_code == 400
+    assert client.post("/api/query/nope", json={}).status_code == 404
+
+    r = client.post("/api/query/orders", json={"sort": [{"column": "price", "desc": True}], "limit": 5})
+    assert r.status_code == 200
+    trailer = [json.loads(line) for line in r.get_data(as_text=True).splitlines()][-1]
+    assert trailer["next_cursor"]
+    r = client.post("/api/query/orders", json={"sort": [{"column": "price", "desc": True}], "limit": 5, "cursor": trailer["next_cursor"]})
+    assert r.status_code == 200
+
+
+def test_reset_shuts_down_the_ai_pool(client):
+    import threading
+    import app as app_module
+
+    frames = {"customers": pd.DataFrame({"customer_id": range(5), "city": ["x"] * 5})}
+    client.post("/api/upload", data=_csv_upload(frames), content_type="multipart/form-data")
+    service = app_module.ai_service
+
+    # Occupy every worker so further jobs stay queued, then reset
+    release = threading.Event()
+    busy = [service.submit(release.wait) for _ in range(service.max_concurrency)]
+    queued = service.submit(lambda: "should not run")
+    assert client.post("/api/reset").status_code == 200
+    release.set()
+
+    assert app_module.ai_service is None
+    assert queued.cancelled()
+    assert all(f.result(timeout=5) for f in busy)
+
+
+def test_reset_by_another_worker_shuts_down_this_workers_ai_pool(client):
+    import threading
+    import app as app_module
+
+    frames = {"customers": pd.DataFrame({"customer_id": range(5), "city": ["x"] * 5})}
+    client.post("/api/upload", data=_csv_upload(frames), content_type="multipart/form-data")
+    service = app_module.ai_service
+
+    release = threading.Event()
+    busy = [service.submit(release.wait) for _ in range(service.max_concurrency)]
+    queued = service.submit(lambda: "should not run")
+    # Another worker's /api/reset only clears the shared pointer; this worker notices on its next request
+    app_module.snapshot_store.clear()
+    assert client.get("/api/schema").status_code == 400
+    release.set()
+
+    assert app_module.ai_service is None
+    assert queued.cancelled()
+    assert all(f.result(timeout=5) for f in busy)
+
+
+def _outlier_frames():
+    prices = [10.0 + (i % 7) for i in range(60)] + [5000.0]
+    return {"orders": pd.DataFrame({"order_id": range(61), "price": prices})}
+
+
+def test_outlier_batch_endpoint_answers_from_the_cache(client, monkeypatch):
+    import app as app_module
+
+    client.post("/api/upload", data=_csv_upload(_outlier_frames()), content_type="multipart/form-data")
+    calls = []
+    monkeypatch.setattr(app_module.ai_service, "_call_gemini_rest",
+                        lambda prompt, **kwargs: calls.append(prompt) or json.dumps({"explanations": [{"id": 0, "reason": "bulk order"}]}))
+
+    first = client.post("/api/outlier-reasoning/batch", json={"table_name": "orders", "top_k": 1}).get_json()
+    second = client.post("/api/outlier-reasoning/batch", json={"table_name": "orders", "top_k": "1"}).get_json()
+
+    assert len(calls) == 1
+    assert [(r["row_index"], r["reason"], r["cached"]) for r in first["orders"]] == [(60, "bulk order", False)]
+    assert [(r["row_index"], r["cached"]) for r in second["orders"]] == [(60, True)]
+
+
+def test_outlier_batch_endpoint_rejects_bad_top_k(client):
+    client.post("/api/upload", data=_csv_upload(_outlier_frames()), content_type="multipart/form-data")
+    for top_k in ("many", 0, -1, [2]):
+        r = client.post("/api/outlier-reasoning/batch", json={"table_name": "orders", "top_k": top_k})
+        assert r.status_code == 400, top_k
+        assert "top_k" in r.get_json()["error"]
+
+
+def test_new_upload_cancels_the_previous_precompute(client, monkeypatch):
+    import threading
+    import app as app_module
+
+    client.post("/api/upload", data=_csv_upload(_outlier_frames()), content_type="multipart/form-data")
+    service = app_module.ai_service
+    release = threading.Event()
+    running = service.submit_background(release.wait)
+    stale = service.submit_background(lambda: "previous upload's explanations")
+
+    client.post("/api/upload", data=_csv_upload(_outlier_frames()), content_type="multipart/form-data")
+    release.set()
+
+    assert app_module.ai_service is service
+    assert stale.cancelled()
+    assert running.result(timeout=5)
@@ -0,0 +1,66 @@
+"""/api/chat over Server-Sent Events, relayed from mock_vertex.py's streaming handler."""
+import io
+import json
+
+import pandas as pd
+import pytest
+
+import mock_vertex
+from telemetry import TELEMETRY
+
+
+@pytest.fixture
+def stream_client(client, mock_vertex, monkeypatch):
+    from ai_service import AIService
+
+    monkeypatch.setattr(AIService, "_get_auth_headers", lambda self: {"Content-Type": "application/json"})
+    frames = {"customers": pd.DataFrame({"customer_id": range(5), "city": ["x"] * 5})}
+    upload = {"files": [(io.BytesIO(df.to_csv(index=False).encode("utf-8")), f"{n}.csv") for n, df in frames.items()]}
+    assert client.post("/api/upload", data=upload, content_type="multipart/form-data").status_code == 200
+    return client
+
+
+def _events(body):
+    events = []
+    for block in body.strip().split("\n\n"):
+        fields = dict(line.split(": ", 1) for line in block.splitlines())
+        events.append((fields["event"], json.loads(fields["data"])))
+    return events
+
+
+def test_chat_streams_tokens_then_done_with_usage(stream_client):
+    r = stream_client.post("/api/chat", json={"question": "what links orders to customers?"},
+                           headers={"Accept": "text/event-stream"})
+
+    assert r.status_code == 200
+    assert r.mimetype == "text/event-stream"
+    assert r.headers["Cache-Control"] == "no-cache"
+    events = _events(r.get_data(as_text=True))
+    tokens = [data["text"] for name, data in events if name == "token"]
+    assert "".join(tokens) == mock_vertex.STREAM_ANSWER
+    assert len(tokens) == len(mock_vertex.STREAM_ANSWER.split(" "))
+
+    name, data = events[-1]
+    assert name == "done" and [n for n, _ in events].count("done") == 1
+    usage = data["usage"]
+    assert usage["ttft_ms"] is not None and usage["ttft_ms"] <= usage["latency_ms"]
+    assert usage["response_tokens"] == len(tokens)
+
+
+def test_closing_the_event_stream_drops_the_upstream_response(stream_client, mock_vertex, monkeypatch):
+    import app as app_module
+
+    mock_vertex.chunk_delay = 0.05
+    upstream = []
+    session = app_module.ai_service.session
+    post = session.post
+    monkeypatch.setattr(session, "post", lambda *args, **kwargs: upstream.append(post(*args, **kwargs)) or upstream[-1])
+    cancelled_before = TELEMETRY.snapshot()["operations"].get("chat_stream", {}).get("cancelled", 0)
+
+    r = stream_client.post("/api/chat", json={"question": "hi"}, headers={"Accept": "text/event-stream"}, buffered=False)
+    first = next(iter(r.response))
+    r.close()  # what the WSGI server does when the browser goes away
+
+    assert first.startswith(b"event: token")
+    assert len(upstream) == 1 and upstream[0].raw.closed
+    assert TELEMETRY.snapshot()["operations"]["chat_stream"]["cancelled"] == cancelled_before + 1
@@ -0,0 +1,37 @@
+import json
+
+import pandas as pd
+
+import cli
+
+
+def test_profile_writes_report_and_keeps_stdout_clean(tmp_path, write_csvs, capsys):
+    data_dir = write_csvs({
+        "customers": pd.DataFrame({"customer_id": range(5), "city": ["a", "b", "c", "d", "e"]}),
+        "orders": pd.DataFrame({"order_id": range(8), "customer_id": [0, 1, 2, 3, 4, 0, 1, 9], "price": [1.5, 2, 3, 4, 5, 6, 7, 800]}),
+    })
+    out = tmp_path / "report.json"
+
+    assert cli.main(["profile", str(data_dir), "-o", str(out)]) == 0
+
+    captured = capsys.readouterr()
+    assert captured.out == ""  # progress output of the loaders goes to stderr
+    assert "Report written to" in captured.err
+    report = json.loads(out.read_text())
+    assert {"generated_at", "data_dir", "policy_source", "validation_policy", "tables", "relationship_graph", "timings_ms"} <= set(report)
+    assert report["policy_source"] == "local"
+    assert sorted(report["tables"]) == ["customers", "orders"]
+    assert {"schema", "metrics", "distributions", "outliers"} <= set(report["tables"]["orders"])
+
+
+def test_profile_to_stdout_is_a_single_json_document(write_csvs, capsys):
+    data_dir = write_csvs({"customers": pd.DataFrame({"customer_id": range(5)})})
+
+    assert cli.main(["profile", str(data_dir), "--indent", "0"]) == 0
+    report = json.loads(capsys.readouterr().out)
+    assert list(report["tables"]) == ["customers"]
+
+
+def test_empty_directory_fails(tmp_path, capsys):
+    assert cli.main(["profile", str(tmp_path)]) == 1
+    assert "No CSV files" in capsys.readouterr().err
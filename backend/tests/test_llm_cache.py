@@ -0,0 +1,120 @@
+import time
+
+import pytest
+
+from llm_cache import ResponseCache, schema_fingerprint
+from ai_service import AIService
+
+
+SCHEMA = {
+    "orders": {"row_count": 10, "columns": [{"name": "order_id", "type": "int64", "classification": "id"},
+                                            {"name": "price", "type": "float64", "classification": "measure"}]},
+    "customers": {"row_count": 3, "columns": [{"name": "customer_id", "type": "int64", "classification": "id"}]},
+}
+
+
+@pytest.fixture
+def cache(tmp_path):
+    return ResponseCache(str(tmp_path / "cache.sqlite3"))
+
+
+def test_fingerprint_ignores_table_and_column_order():
+    reordered = {
+        "customers": SCHEMA["customers"],
+        "orders": dict(SCHEMA["orders"], columns=list(reversed(SCHEMA["orders"]["columns"]))),
+    }
+    for options in ({}, {"column_fields": ("type",)}, {"total_rows": True}):
+        assert schema_fingerprint(reordered, **options) == schema_fingerprint(SCHEMA, **options)
+
+
+def test_fingerprint_only_covers_what_the_prompt_uses():
+    appended = dict(SCHEMA, orders=dict(SCHEMA["orders"], row_count=500))
+    retyped = dict(SCHEMA, orders=dict(SCHEMA["orders"], columns=[dict(SCHEMA["orders"]["columns"][0], type="object"), SCHEMA["orders"]["columns"][1]]))
+
+    # The validation policy prompt shows names and types, never row counts
+    assert schema_fingerprint(appended, column_fields=("type",)) == schema_fingerprint(SCHEMA, column_fields=("type",))
+    assert schema_fingerprint(retyped, column_fields=("type",)) != schema_fingerprint(SCHEMA, column_fields=("type",))
+    # Overview and docs show the total row count but not the types
+    assert schema_fingerprint(appended, total_rows=True) != schema_fingerprint(SCHEMA, total_rows=True)
+    assert schema_fingerprint(retyped, total_rows=True) == schema_fingerprint(SCHEMA, total_rows=True)
+    assert schema_fingerprint(dict(SCHEMA, extra={"columns": []})) != schema_fingerprint(SCHEMA)
+
+
+def test_appending_rows_reuses_the_cached_validation_policy(tmp_path, monkeypatch):
+    monkeypatch.setenv("INSIGHTDB_LLM_CACHE", str(tmp_path / "ai.sqlite3"))
+    service = AIService()
+    calls = []
+    monkeypatch.setattr(service, "_call_gemini_rest", lambda prompt, **kwargs: calls.append(prompt) or '{"orders": {}}')
+    try:
+        service.generate_validation_policy(SCHEMA)
+        service.generate_validation_policy(dict(SCHEMA, orders=dict(SCHEMA["orders"], row_count=500)))
+        assert len(calls) == 1
+        service.generate_project_overview(SCHEMA)
+        service.generate_project_overview(dict(SCHEMA, orders=dict(SCHEMA["orders"], row_count=500)))
+        assert len(calls) == 3
+    finally:
+        service.close()
+
+
+def test_hits_misses_and_hit_rate(cache):
+    assert cache.get("k") is None
+    cache.set("k", {"answer": 42})
+    assert cache.get("k") == {"answer": 42}
+    assert cache.get("k") == {"answer": 42}
+
+    stats = cache.stats()
+    assert (stats["hits"], stats["misses"], stats["writes"], stats["entries"]) == (2, 1, 1, 1)
+    assert stats["hit_rate"] == round(2 / 3, 4)
+
+
+def test_expired_entries_are_misses(tmp_path, monkeypatch):
+    cache = ResponseCache(str(tmp_path / "cache.sqlite3"), ttl_seconds=60)
+    cache.set("k", "v")
+    now = time.time()
+    monkeypatch.setattr(time, "time", lambda: now + 61)
+
+    assert cache.get("k") is None
+    stats = cache.stats()
+    assert stats["expired"] == 1 and stats["misses"] == 1 and stats["entries"] == 0
+
+
+def test_size_bound_evicts_least_recently_used(tmp_path, monkeypatch):
+    cache = ResponseCache(str(tmp_path / "cache.sqlite3"), max_bytes=25)
+    clock = [1000.0]
+    monkeypatch.setattr(time, "time", lambda: clock[0])
+    for key in ("a", "b"):
+        cache.set(key, "x" * 8)  # 10 bytes as JSON
+        clock[0] += 1
+    cache.get("a")  # "b" is now the least recently used
+    clock[0] += 1
+    cache.set("c", "x" * 8)
+
+    assert cache.get("b") is None
+    assert cache.get("a") and cache.get("c")
+    assert cache.stats()["evictions"] == 1
+
+
+def test_claims_are_exclusive_until_released_or_expired(cache):
+    owner = cache.claim("k", lease_seconds=60)
+    assert owner and cache.claim("k", lease_seconds=60) is None
+
+    cache.release("k", "someone else")
+    assert cache.claim("k", lease_seconds=60) is None
+    cache.release("k", owner)
+    assert cache.claim("k", lease_seconds=-1)  # an already expired lease
+    assert cache.claim("k", lease_seconds=60)
+
+
+def test_wait_for_returns_the_claim_holders_answer(cache):
+    import threading
+
+    owner = cache.claim("k", lease_seconds=60)
+
+    def finish():
+        time.sleep(0.1)
+        cache.set("k", "generated once")
+        cache.release("k", owner)
+    threading.Thread(target=finish).start()
+
+    assert cache.wait_for("k", timeout=5, poll_seconds=0.02) == "generated once"
+    assert cache.wait_for("missing", timeout=5) is None  # nobody is generating it
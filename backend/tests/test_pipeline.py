@@ -0,0 +1,82 @@
+import pandas as pd
+
+from pipeline import Pipeline
+from schema_analyzer import SchemaAnalyzer
+from quality_engine import QualityEngine
+
+
+def _tables():
+    return {
+        "customers": pd.DataFrame({"customer_id": [1, 2, 3], "signup_date": ["2024-01-01", "2024-02-01", "2024-03-01"]}),
+        "orders": pd.DataFrame({
+            "order_id": [10, 11, 12, 13],
+            "customer_id": [1, 1, 2, 9],
+            "amount": [5.0, 7.5, 3.0, 12.0],
+            "order_date": ["2024-03-01", "2024-03-02", "2024-03-05", "2024-03-09"],
+        }),
+    }
+
+
+def _run(pipeline, tables, label, policy=None):
+    pipeline.begin_run(label)
+    schema = SchemaAnalyzer(tables, pipeline=pipeline).analyze()
+    engine = QualityEngine(tables, schema, validation_policy=policy, pipeline=pipeline)
+    engine.compute_metrics()
+    return engine, {n["node"]: n for n in pipeline.report()["runs"][-1]["nodes"]}
+
+
+def _recomputed(nodes):
+    return {name for name, n in nodes.items() if n["status"] == "recomputed"}
+
+
+def test_first_run_computes_and_second_run_reuses_everything():
+    pipeline = Pipeline()
+    first, nodes = _run(pipeline, _tables(), "first")
+    assert all(n["reason"] == "new node" for n in nodes.values())
+
+    # Fresh DataFrames with the same content hash to the same keys
+    second, nodes = _run(pipeline, _tables(), "second")
+    assert _recomputed(nodes) == set()
+    assert second.metrics == first.metrics
+
+
+def test_adding_a_table_without_dates_keeps_other_tables_cached():
+    pipeline = Pipeline()
+    _run(pipeline, _tables(), "first")
+    tables = dict(_tables(), regions=pd.DataFrame({"region": ["n", "s"], "population": [10, 20]}))
+
+    _, nodes = _run(pipeline, tables, "append")
+
+    recomputed = _recomputed(nodes)
+    assert nodes["global_max_date"]["reason"] == "changed: regions"
+    assert "freshness:customers" not in recomputed
+    assert "metrics:orders" not in recomputed
+    # Table names feed FK inference, so schemas are re-derived, but their checks are reused
+    assert "schema:orders" in recomputed
+    assert {n for n in recomputed if n.endswith(":regions")} >= {"schema:regions", "metrics:regions"}
+
+
+def test_policy_change_reruns_only_that_tables_metrics():
+    pipeline = Pipeline()
+    _run(pipeline, _tables(), "first")
+
+    engine, nodes = _run(pipeline, _tables(), "policy", policy={"orders": {"amount": {"range": [0, 10]}}})
+
+    assert _recomputed(nodes) == {"metrics:orders"}
+    assert nodes["metrics:orders"]["reason"] == "changed: policy"
+    assert any("Value range violation in amount" in i for i in engine.metrics["orders"]["issues"])
+
+
+def test_changing_one_column_reruns_only_its_checks():
+    pipeline = Pipeline()
+    _run(pipeline, _tables(), "first")
+    tables = _tables()
+    tables["orders"].loc[0, "amount"] = 500.0
+
+    _, nodes = _run(pipeline, tables, "edit")
+
+    recomputed = _recomputed(nodes)
+    assert "numeric.amount:orders" in recomputed
+    assert "fk.customer_id:orders" not in recomputed
+    assert "timestamp.order_date:orders" not in recomputed
+    assert not {n for n in recomputed if n.endswith(":customers")}
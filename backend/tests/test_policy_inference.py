@@ -0,0 +1,86 @@
+import pandas as pd
+import pytest
+
+from policy_inference import PolicyInferencer, merge_policies
+from schema_analyzer import SchemaAnalyzer
+
+
+def _infer(df, name="t"):
+    tables = {name: df}
+    return PolicyInferencer(tables, SchemaAnalyzer(tables).analyze()).infer().get(name, {})
+
+
+def test_sign_lexicon_wins_over_the_observed_distribution():
+    n = 100
+    policy = _infer(pd.DataFrame({
+        "price": [-1.0] * 30 + [5.0] * (n - 30),       # unsigned name, despite 30% negatives
+        "profit_delta": [1.0] * n,                      # signed name, despite no negatives
+        "reading": [-2.0] * 20 + [3.0] * (n - 20),      # no hint: 20% negatives means signed
+        "level": [-2.0] * 2 + [3.0] * (n - 2),          # no hint: 2% negatives look like bad data
+    }))
+
+    assert policy["price"]["is_unsigned"] is True
+    assert policy["profit_delta"]["is_unsigned"] is False
+    assert policy["reading"]["is_unsigned"] is False
+    assert policy["level"]["is_unsigned"] is True
+
+
+@pytest.mark.parametrize("values, expected", [
+    ([-23.5, -10.0, 5.2, 40.0], [-90, 90]),
+    ([1200.0, 1300.0, 1250.0, 1400.0], None),  # mean outside [-90, 90]: a projected coordinate, not degrees
+])
+def test_named_ranges_are_gated_by_the_mean(values, expected):
+    policy = _infer(pd.DataFrame({"geolocation_lat": values}))
+    assert policy["geolocation_lat"].get("range") == expected
+
+
+def test_regex_inference_from_name_hints_and_content():
+    n = 50
+    policy = _infer(pd.DataFrame({
+        "customer_zip_code_prefix": [f"{10000 + i}" for i in range(n)],
+        "contact": [f"user{i}@example.com" for i in range(n)],
+        "mobile": [f"+55 11 9{i:04d}-0000" for i in range(n)],
+    }))
+
+    assert policy["customer_zip_code_prefix"]["regex"] == r"\d{4,5}(-?\d{3,4})?"
+    assert policy["contact"]["regex"] == r"[^@\s]+@[^@\s]+\.[^@\s]+"  # emails are detectable from content alone
+    assert policy["mobile"]["regex"] == r"\+?[\d\s\-().]{7,20}"
+
+
+def test_numeric_codes_are_not_tagged_as_zip_without_a_name_hint():
+    policy = _infer(pd.DataFrame({"sku": [f"{10000 + i}" for i in range(50)], "batch_ref": [f"{i:05d}" for i in range(50)]}))
+    assert "regex" not in policy.get("sku", {})
+    assert "regex" not in policy.get("batch_ref", {})
+
+
+def test_sequences_are_reduced_to_the_direct_chain():
+    purchase = pd.date_range("2021-01-01", periods=20, freq="D")
+    policy = _infer(pd.DataFrame({
+        "order_purchase_timestamp": purchase.astype(str),
+        "order_approved_at_time": (purchase + pd.Timedelta(hours=2)).astype(str),
+        "order_delivered_date": (purchase + pd.Timedelta(days=5)).astype(str),
+    }))
+
+    assert policy["order_purchase_timestamp"]["sequence_rules"] == [
+        {"before": "order_purchase_timestamp", "after": "order_approved_at_time"}]
+    assert policy["order_approved_at_time"]["sequence_rules"] == [
+        {"before": "order_approved_at_time", "after": "order_delivered_date"}]
+
+
+def test_merge_policies_overlays_skips_none_and_unions_sequence_rules():
+    rule_a = {"before": "a", "after": "b"}
+    rule_b = {"before": "a", "after": "c"}
+    base = {"t": {"a": {"is_unsigned": True, "range": [0, 10], "sequence_rules": [rule_a]}}}
+    override = {
+        "t": {"a": {"is_unsigned": False, "range": None, "regex": r"\d+", "sequence_rules": [rule_a, rule_b]}},
+        "u": {"x": {"is_unsigned": True}},
+        "bad": ["not", "a", "dict"],
+    }
+
+    merged = merge_policies(base, override)
+
+    assert merged["t"]["a"] == {"is_unsigned": False, "range": [0, 10], "regex": r"\d+", "sequence_rules": [rule_a, rule_b]}
+    assert merged["u"] == {"x": {"is_unsigned": True}}
+    assert "bad" not in merged
+    assert base["t"]["a"]["sequence_rules"] == [rule_a]  # base is not mutated
+    assert merge_policies(base, None) == base
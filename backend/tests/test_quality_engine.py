@@ -0,0 +1,93 @@
+import pandas as pd
+
+from schema_analyzer import SchemaAnalyzer
+from quality_engine import QualityEngine
+
+
+def _run(tables):
+    schema = SchemaAnalyzer(tables).analyze()
+    engine = QualityEngine(tables, schema)
+    engine.compute_metrics()
+    return engine
+
+
+def test_bool_column_with_rare_true_value():
+    tables = {"flags": pd.DataFrame({"flag": [True] + [False] * 200, "amount": range(201)})}
+    engine = _run(tables)
+
+    assert 0 <= engine.metrics["flags"]["trust_score"] <= 100
+    assert engine.outliers["flags"]["flag"]["rows"][0]["row_index"] == 0
+    dist = engine.distributions["flags"]["flag"]
+    assert dist["kind"] == "numeric"
+    assert dist["min"] == 0.0 and dist["max"] == 1.0
+
+
+def test_mixed_dtype_table():
+    df = pd.DataFrame({
+        "row_id": range(120),
+        "mixed": [1, "two", 3.0, None] * 30,                        # object column of ints, strings, floats
+        "nullable_int": pd.array([1, None, 3] * 40, dtype="Int64"),
+        "ratio": [0.5, float("inf"), -0.25, None] * 30,
+        "all_null": [None] * 120,
+        "created_date": ["2024-01-01", "not a date", None, "2024-03-05"] * 30,
+        "kind": ["a", "b", "c"] * 40,
+    })
+    engine = _run({"mixed": df})
+    metrics = engine.metrics["mixed"]
+
+    assert 0 <= metrics["trust_score"] <= 100
+    assert metrics["completeness"] < 100
+    dists = engine.distributions["mixed"]
+    assert dists["ratio"]["kind"] == "numeric" and dists["ratio"]["max"] == 0.5
+    assert dists["nullable_int"]["count"] == 80
+    assert dists["created_date"]["kind"] == "timestamp"
+    assert "kind" not in dists or dists["kind"]["kind"] == "categorical"
+
+
+def test_empty_and_header_only_tables():
+    engine = _run({
+        "empty": pd.DataFrame({"id": pd.Series([], dtype="int64"), "price": pd.Series([], dtype="float64")}),
+        "one": pd.DataFrame({"id": [1], "price": [2.0]}),
+    })
+
+    assert engine.metrics["empty"]["trust_score"] == 0.0
+    assert engine.metrics["one"]["trust_score"] > 0
+
+
+def test_numeric_distribution_bins_and_quantiles():
+    values = [float(i) for i in range(1000)] + [float("inf")]
+    engine = _run({"t": pd.DataFrame({"amount": values})})
+    dist = engine.distributions["t"]["amount"]
+
+    assert len(dist["counts"]) == QualityEngine.HISTOGRAM_BINS
+    assert len(dist["bin_edges"]) == QualityEngine.HISTOGRAM_BINS + 1
+    assert sum(dist["counts"]) == 1000  # non-finite values are left out of the histogram
+    assert (dist["min"], dist["max"]) == (0.0, 999.0)
+    assert list(dist["quantiles"]) == ["p1", "p5", "p25", "p50", "p75", "p95", "p99"]
+    assert dist["quantiles"]["p50"] == 500.0
+
+
+def test_categorical_distribution_keeps_top_k_and_other_count():
+    # 15 categories, "c0" the most frequent; strings as read from a CSV
+    values = [f"c{i}" for i in range(15) for _ in range(15 - i)]
+    engine = _run({"t": pd.DataFrame({"status": pd.Series(values, dtype="string")})})
+    dist = engine.distributions["t"]["status"]
+
+    assert dist["kind"] == "categorical"
+    assert dist["distinct"] == 15 and dist["count"] == len(values)
+    assert [e["value"] for e in dist["top"]] == [f"c{i}" for i in range(QualityEngine.TOP_K_CATEGORIES)]
+    assert dist["top"][0]["count"] == 15
+    assert dist["other_count"] == sum(range(1, 6))  # c10..c14
+
+
+def test_timestamp_distribution_switches_from_days_to_months_after_400_days():
+    start = pd.Timestamp("2022-01-01")
+    short = _run({"t": pd.DataFrame({"order_date": [start, start + pd.Timedelta(days=400)]})})
+    long = _run({"t": pd.DataFrame({"order_date": [start, start + pd.Timedelta(days=401)]})})
+
+    short_dist = short.distributions["t"]["order_date"]
+    assert short_dist["granularity"] == "day"
+    assert short_dist["counts"] == {"2022-01-01": 1, "2023-02-05": 1}
+    long_dist = long.distributions["t"]["order_date"]
+    assert long_dist["granularity"] == "month"
+    assert long_dist["counts"] == {"2022-01": 1, "2023-02": 1}
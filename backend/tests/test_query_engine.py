@@ -0,0 +1,124 @@
+import json
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from query_engine import QueryEngine
+
+
+@pytest.fixture
+def engine():
+    df = pd.DataFrame({
+        "order_id": range(10),
+        "price": [5.0, 1.0, None, 3.0, 3.0, 9.0, 2.0, 7.0, 4.0, 8.0],
+        "status": ["ok", "late", "ok", "ok", "late", "ok", "ok", "late", "ok", "ok"],
+    })
+    return QueryEngine({"orders": df}, version="v1")
+
+
+def _page(engine, spec, table="orders"):
+    lines = [json.loads(line) for line in engine.execute(table, spec)]
+    rows = [row for chunk in lines[1:-1] for row in chunk["rows"]]
+    return lines[0]["columns"], rows, lines[-1]
+
+
+def _all_pages(engine, spec):
+    rows, cursor = [], None
+    while True:
+        _, page, trailer = _page(engine, dict(spec, cursor=cursor))
+        rows.extend(page)
+        cursor = trailer["next_cursor"]
+        if cursor is None:
+            return rows
+
+
+def test_sorted_pages_seek_without_gaps_or_duplicates(engine):
+    spec = {"columns": ["order_id", "price"], "sort": [{"column": "price", "desc": True}], "limit": 3}
+    rows = _all_pages(engine, spec)
+
+    assert [r[0] for r in rows] == [5, 9, 7, 0, 8, 3, 4, 6, 1, 2]  # ties keep row order, nulls last
+
+
+def test_filters_apply_across_pages(engine):
+    spec = {
+        "columns": ["order_id"],
+        "filters": [{"column": "status", "op": "eq", "value": "ok"}, {"column": "price", "op": "ge", "value": 4}],
+        "sort": [{"column": "price"}],
+        "limit": 2,
+    }
+    assert [r[0] for r in _all_pages(engine, spec)] == [8, 0, 9, 5]
+
+
+def test_group_by_aggregates(engine):
+    columns, rows, trailer = _page(engine, {"group_by": ["status"], "aggregates": [{"column": "price", "func": "sum"}]})
+
+    assert columns == ["status", "sum_price"]
+    assert dict(map(tuple, rows)) == {"late": 11.0, "ok": 31.0}
+    assert trailer == {"row_count": 2, "next_cursor": None}
+
+
+def test_cursor_is_rejected_for_another_spec_or_version(engine):
+    spec = {"sort": [{"column": "price"}], "limit": 4}
+    cursor = _page(engine, spec)[2]["next_cursor"]
+
+    with pytest.raises(ValueError, match="restart the query"):
+        _page(engine, {"sort": [{"column": "order_id"}], "limit": 4, "cursor": cursor})
+
+    reloaded = QueryEngine(engine.tables, version="v2")
+    with pytest.raises(ValueError, match="restart the query"):
+        _page(reloaded, dict(spec, cursor=cursor))
+
+    same_version = QueryEngine(engine.tables, version="v1")
+    assert _page(same_version, dict(spec, cursor=cursor))[1]
+
+
+@pytest.mark.parametrize("spec", [
+    {"sort": [{"desc": True}]},
+    {"sort": "price"},
+    {"filters": [{"op": "eq", "value": 1}]},
+    {"aggregates": [{"func": "sum"}]},
+    {"columns": ["nope"]},
+    {"columns": "price"},
+    {"filters": [{"column": "price", "op": "regex", "value": "."}]},
+    {"cursor": "garbage"},
+    {"limit": 0},
+])
+def test_malformed_specs_raise_value_error(engine, spec):
+    with pytest.raises(ValueError):
+        _page(engine, spec)
+
+
+def test_columns_must_be_a_list(engine):
+    with pytest.raises(ValueError, match="'columns' must be a list"):
+        _page(engine, {"columns": "price"})
+
+
+def test_cached_permutations_are_int32_and_masks_are_reused(engine, monkeypatch):
+    spec = {"filters": [{"column": "status", "op": "eq", "value": "ok"}], "sort": [{"column": "price"}], "limit": 2}
+    _page(engine, spec)
+    order, rank = engine._sort_order("orders", engine.tables["orders"], spec["sort"])
+    assert order.dtype == rank.dtype == np.int32
+
+    # Later pages reuse the cached mask instead of rescanning the table
+    monkeypatch.setattr(engine, "_filter_mask", lambda *args: pytest.fail("filter mask recomputed"))
+    assert [r[0] for r in _all_pages(engine, spec)] == [6, 3, 8, 0, 9, 5, 2]
+
+
+def test_cache_is_bounded_by_bytes(engine, monkeypatch):
+    # One (order, rank) pair over 10 rows is 80 bytes; room for two of them
+    monkeypatch.setattr(QueryEngine, "CACHE_BYTES", 160)
+    for column in ("order_id", "price", "status"):
+        _page(engine, {"sort": [{"column": column}]})
+
+    assert [key[2][0][0] for key in engine._cache] == ["price", "status"]
+    assert engine._cache_bytes == 160
+
+    monkeypatch.setattr(QueryEngine, "CACHE_BYTES", 50)
+    _page(engine, {"sort": [{"column": "order_id", "desc": True}]})
+    assert ("sort", "orders", (("order_id", True),)) not in engine._cache
+
+
+def test_unknown_table_is_a_key_error(engine):
+    with pytest.raises(KeyError):
+        engine.execute("missing", {})
@@ -0,0 +1,66 @@
+import time
+import threading
+
+from rate_limit import TokenBucket, SingleFlight, backoff_delay
+from ai_service import AIService
+
+
+def test_token_bucket_burst_then_timeout():
+    bucket = TokenBucket(60, burst=2)
+    assert bucket.acquire(timeout=0)
+    assert bucket.acquire(timeout=0)
+    assert not bucket.acquire(timeout=0.01)
+
+
+def test_penalize_blocks_until_retry_after():
+    bucket = TokenBucket(6000, burst=5)
+    bucket.penalize(0.2)
+    started = time.monotonic()
+    assert bucket.acquire(timeout=1)
+    assert time.monotonic() - started >= 0.15
+
+
+def test_single_flight_runs_leader_only_once():
+    flight = SingleFlight()
+    calls = []
+    assert flight.do("k", lambda: calls.append(1) or "v") == "v"
+    assert flight.in_flight() == 0 and calls == [1]
+
+
+def test_backoff_never_undercuts_retry_after():
+    assert backoff_delay(0, retry_after=7) >= 7
+    assert backoff_delay(10, cap=5) <= 5
+
+
+def test_low_priority_callers_leave_the_reserve_alone():
+    bucket = TokenBucket(60, burst=4)  # reserve = 2
+    assert bucket.acquire(timeout=0, low_priority=True)
+    assert bucket.acquire(timeout=0, low_priority=True)
+    assert not bucket.acquire(timeout=0.01, low_priority=True)
+    # Interactive callers still get the reserved tokens
+    assert bucket.acquire(timeout=0)
+    assert bucket.acquire(timeout=0)
+
+
+def test_low_priority_callers_yield_to_waiting_callers():
+    bucket = TokenBucket(600, burst=1)  # one token every 0.1 s, no reserve
+    bucket.acquire(timeout=0)
+    order = []
+    low = threading.Thread(target=lambda: bucket.acquire(timeout=2, low_priority=True) and order.append("low"))
+    low.start()
+    time.sleep(0.02)
+    assert bucket.acquire(timeout=2)
+    order.append("high")
+    low.join()
+    assert order == ["high", "low"]
+
+
+def test_ai_service_splits_quota_across_processes(monkeypatch, tmp_path):
+    # The per-worker log file is named after the pid; keep it out of the source tree
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setenv("INSIGHTDB_AI_RPM", "60")
+    monkeypatch.setenv("INSIGHTDB_AI_BURST", "8")
+    monkeypatch.setenv("INSIGHTDB_AI_PROCESSES", "4")
+    limiter = AIService().limiter
+    assert limiter.rate == 15 / 60.0
+    assert limiter.capacity == 2
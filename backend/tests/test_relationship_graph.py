@@ -0,0 +1,43 @@
+import pandas as pd
+
+from schema_analyzer import SchemaAnalyzer
+from quality_engine import QualityEngine
+from relationship_graph import build_relationship_graph
+
+
+def _graph(tables):
+    schema = SchemaAnalyzer(tables).analyze()
+    engine = QualityEngine(tables, schema)
+    engine.compute_metrics()
+    return build_relationship_graph(schema, engine.metrics, engine.relationships)
+
+
+def test_edges_match_rates_cardinality_and_propagation():
+    graph = _graph({
+        "customers": pd.DataFrame({"customer_id": [1, 2, 3]}),
+        "orders": pd.DataFrame({"order_id": [10, 11, 12, 13], "customer_id": [1, 1, 2, 9]}),
+        "items": pd.DataFrame({"item_id": [1, 2, 3], "order_id": [10, 10, 13]}),
+    })
+    edges = {e["source"]: e for e in graph["edges"]}
+
+    orders = edges["orders"]
+    assert orders["target"] == "customers"
+    assert (orders["orphan_rows"], orders["child_match_rate"], orders["parent_match_rate"]) == (1, 0.75, 0.6667)
+    assert orders["cardinality"] == "1:N"
+    assert orders["broken"] and orders["propagates_to"] == ["items"] and orders["propagation_depth"] == 1
+    assert not edges["items"]["broken"] and edges["items"]["propagates_to"] == []
+    assert {n["id"] for n in graph["nodes"] if n["on_broken_branch"]} == {"orders", "items"}
+
+
+def test_junction_table_reports_many_to_many():
+    graph = _graph({
+        "products": pd.DataFrame({"product_id": [1, 2, 3]}),
+        "tags": pd.DataFrame({"tag_id": [1, 2]}),
+        "product_tags": pd.DataFrame({"link_id": range(5), "product_id": [1, 1, 2, 3, 3], "tag_id": [1, 2, 1, 1, 2]}),
+    })
+
+    assert {e["cardinality"] for e in graph["edges"]} == {"1:N"}
+    assert graph["many_to_many"] == [{
+        "tables": ["products", "tags"], "junction": "product_tags",
+        "columns": ["product_id", "tag_id"], "cardinality": "N:M"
+    }]
@@ -0,0 +1,71 @@
+import pandas as pd
+
+from snapshot_store import SnapshotStore
+
+
+def test_publish_and_load_roundtrip(tmp_path):
+    store = SnapshotStore(str(tmp_path))
+    df = pd.DataFrame({"id": [1, 2, 3], "name": ["a", "b", None]})
+    version = store.publish({"t": df}, {"schema": {"t": {"row_count": 3}}})
+
+    assert store.current_version() == version
+    tables, artifacts = store.load(version)
+    assert list(tables.keys()) == ["t"]
+    pd.testing.assert_frame_equal(tables["t"], df, check_dtype=False)
+    assert artifacts["schema"]["t"]["row_count"] == 3
+
+
+def test_publish_artifacts_merges_into_base_version(tmp_path):
+    store = SnapshotStore(str(tmp_path))
+    base = store.publish({"a": pd.DataFrame({"x": [1]})}, {"docs": None, "schema": "A"})
+
+    version = store.publish_artifacts({"docs": "docs for A"}, base_version=base)
+
+    assert version and version != base
+    tables, artifacts = store.load(store.current_version())
+    assert list(tables.keys()) == ["a"]
+    assert artifacts == {"docs": "docs for A", "schema": "A"}
+    # Cursors stay valid: the tables are still the ones first published as ``base``
+    assert tables.tables_version == base
+
+
+def test_publish_artifacts_is_dropped_when_current_moved_on(tmp_path):
+    store = SnapshotStore(str(tmp_path))
+    version_a = store.publish({"a": pd.DataFrame({"x": [1]})}, {"docs": None})
+    version_b = store.publish({"b": pd.DataFrame({"y": [2]})}, {"docs": None})
+
+    assert store.publish_artifacts({"docs": "docs for A"}, base_version=version_a) is None
+    assert store.current_version() == version_b
+    tables, artifacts = store.load(version_b)
+    assert list(tables.keys()) == ["b"]
+    assert artifacts["docs"] is None
+
+
+def test_clear_then_publish_artifacts_is_a_noop(tmp_path):
+    store = SnapshotStore(str(tmp_path))
+    version = store.publish({"a": pd.DataFrame({"x": [1]})}, {})
+    store.clear()
+
+    assert store.current_version() == ""
+    assert store.publish_artifacts({"docs": "late"}, base_version=version) is None
+
+
+def test_prune_keeps_every_version_of_the_previous_upload(tmp_path):
+    store = SnapshotStore(str(tmp_path))
+
+    def upload(name):
+        versions = [store.publish({name: pd.DataFrame({"x": [1]})}, {"docs": None})]
+        versions.append(store.publish_artifacts({"policy": name}, versions[-1]))
+        versions.append(store.publish_artifacts({"docs": name}, versions[-1]))
+        return versions
+
+    first = upload("a")
+    second = upload("b")
+    # A worker that adopted any version of the previous upload can still map its tables
+    for version in first + second:
+        tables, _ = store.load(version)
+        assert tables.arrow(tables.keys()[0]).num_rows == 1
+
+    third = upload("c")
+    remaining = sorted(d for d in tmp_path.iterdir() if d.name.startswith("v"))
+    assert [d.name for d in remaining] == sorted(second + third)
@@ -0,0 +1,56 @@
+import os
+import json
+
+from telemetry import Telemetry, get_logger, _process_log_file
+
+
+def test_single_process_keeps_the_shared_log_name(monkeypatch):
+    monkeypatch.delenv("INSIGHTDB_AI_PROCESSES", raising=False)
+    assert _process_log_file("gemini_api.log") == "gemini_api.log"
+
+
+def test_workers_log_to_per_pid_files(tmp_path, monkeypatch):
+    monkeypatch.setenv("INSIGHTDB_AI_PROCESSES", "4")
+    logger = get_logger(str(tmp_path / "api.log"))
+    logger.info("hello")
+    assert logger.name.endswith(f"api.{os.getpid()}.log")
+
+
+def test_cancelled_streams_are_not_errors():
+    telemetry = Telemetry()
+    telemetry.record("chat_stream", "cancelled", 120.0)
+    telemetry.record("chat_stream", 200, 300.0, prompt_tokens=10, response_tokens=5)
+
+    op = telemetry.snapshot()["operations"]["chat_stream"]
+    assert op["errors"] == 0 and op["error_rate"] == 0.0
+    assert op["cancelled"] == 1
+    assert op["latency_ms"]["count"] == 1
+    assert 'insightdb_ai_cancelled_total{operation="chat_stream"} 1' in telemetry.render_prometheus()
+
+
+def test_scrapes_sum_the_counters_of_every_worker(tmp_path):
+    shared = str(tmp_path / "telemetry")
+    telemetry = Telemetry(shared)
+    telemetry.record("validation_policy", 200, 800.0, prompt_tokens=100, response_tokens=20)
+    telemetry.record("validation_policy", 429, 50.0)
+    # Another worker (or one that has exited) left its counters in the shared directory
+    other = Telemetry._empty_state()
+    other["calls"] = {"validation_policy": {"200": 2}, "chat_stream": {"cancelled": 1}}
+    other["cancelled"] = {"chat_stream": 1}
+    other["tokens"] = {"prompt": 50, "response": 10}
+    other["latency"] = {"validation_policy": {"buckets": [0, 0, 0, 0, 2, 2, 2, 2, 2, 2], "sum": 1800.0, "count": 2}}
+    (tmp_path / "telemetry" / "999999.json").write_text(json.dumps(other))
+
+    snapshot = telemetry.snapshot()
+    assert snapshot["workers"] == 2
+    assert snapshot["tokens"] == {"prompt": 150, "response": 30}
+    policy = snapshot["operations"]["validation_policy"]
+    assert policy["calls"] == {"200": 3, "429": 1}
+    assert policy["error_rate"] == 0.25
+    assert policy["latency_ms"]["count"] == 4
+    assert snapshot["operations"]["chat_stream"]["cancelled"] == 1
+
+    # Our own counters were written for the other workers to merge
+    written = json.loads((tmp_path / "telemetry" / f"{os.getpid()}.json").read_text())
+    assert written["calls"]["validation_policy"] == {"200": 1, "429": 1}
+    assert 'insightdb_ai_calls_total{operation="validation_policy",status="200"} 3' in telemetry.render_prometheus()
@@ -0,0 +1,97 @@
+"""AIService against mock_vertex.py: retries on 429, Retry-After, and request coalescing."""
+import time
+import threading
+
+import pytest
+
+from ai_service import AIService
+
+
+@pytest.fixture
+def make_service(tmp_path, monkeypatch, mock_vertex):
+    """Builds AIServices sharing one response cache, like gunicorn workers on one host."""
+    monkeypatch.setenv("INSIGHTDB_LLM_CACHE", str(tmp_path / "llm_cache.sqlite3"))
+    monkeypatch.setenv("INSIGHTDB_AI_BURST", "10")
+    services = []
+
+    def make():
+        services.append(AIService())
+        return services[-1]
+    yield make
+    for service in services:
+        service.close()
+
+
+SCHEMA = {"orders": {"row_count": 3, "columns": [{"name": "order_id", "type": "int64"}]}}
+
+
+def test_429s_are_retried_after_the_servers_retry_after(make_service, mock_vertex):
+    mock_vertex.fail_first = 2
+    mock_vertex.retry_after = 0.5
+    service = make_service()
+
+    started = time.monotonic()
+    text = service._call_gemini_rest("explain", operation="test")
+    elapsed = time.monotonic() - started
+
+    assert text == "Mock answer from the local Vertex AI stub."
+    assert mock_vertex.requests == 3
+    stats = service.limiter_stats()
+    assert stats["retries"] == 2 and stats["throttled"] == 2
+    assert elapsed >= 2 * 0.5
+
+
+def test_gives_up_after_max_retries(make_service, mock_vertex, monkeypatch):
+    monkeypatch.setenv("INSIGHTDB_AI_MAX_RETRIES", "1")
+    mock_vertex.fail_first = 5
+    mock_vertex.retry_after = 0.1
+    service = make_service()
+
+    assert service._call_gemini_rest("explain", operation="test") is None
+    assert mock_vertex.requests == 2
+    assert "429" in service._last_error
+
+
+def test_identical_concurrent_calls_in_one_process_share_one_request(make_service, mock_vertex):
+    mock_vertex.delay = 0.3
+    service = make_service()
+
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(service._call_gemini_rest("same prompt"))) for _ in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert mock_vertex.requests == 1
+    assert len(set(results)) == 1 and results[0]
+    assert service.limiter_stats()["coalesced"] == 3
+
+
+def test_docs_generation_is_coalesced_across_workers(make_service, mock_vertex):
+    mock_vertex.delay = 0.5
+    publisher, adopter = make_service(), make_service()
+
+    # The publishing worker generates in the background; a tab on another worker asks for the docs meanwhile
+    background = publisher.submit(publisher.generate_full_documentation, SCHEMA)
+    time.sleep(0.1)
+    docs = adopter.generate_full_documentation(SCHEMA)
+
+    assert docs == background.result(timeout=5) == {"title": "Mock Project", "explanations": []}
+    assert mock_vertex.requests == 1
+    assert adopter.limiter_stats()["coalesced_across_workers"] == 1
+
+
+def test_failed_leader_lets_waiting_workers_try_themselves(make_service, mock_vertex, monkeypatch):
+    monkeypatch.setenv("INSIGHTDB_AI_MAX_RETRIES", "0")
+    mock_vertex.fail_first = 1
+    mock_vertex.delay = 0.3
+    first, second = make_service(), make_service()
+
+    failed = first.submit(first.generate_validation_policy, SCHEMA)
+    time.sleep(0.1)
+    policy = second.generate_validation_policy(SCHEMA)
+
+    assert failed.result(timeout=5) == {}
+    assert policy == {"title": "Mock Project", "explanations": []}
+    assert mock_vertex.requests == 2
@@ -682,12 +682,46 @@ async function sendMessage() {
     try {
         const res = await fetch(`${API_BASE}/chat`, {
             method: 'POST',
-            headers: { 'Content-Type': 'application/json' },
+            headers: { 'Content-Type': 'application/json', 'Accept': 'text/event-stream' },
             body: JSON.stringify({ question: text })
         });
-        const data = await res.json();
-        hideTypingIndicator(typingId);
-        addMessage(data.answer, 'bot');
+
+        if (!res.body || !(res.headers.get('Content-Type') || '').includes('text/event-stream')) {
+            const data = await res.json();
+            hideTypingIndicator(typingId);
+            addMessage(data.answer || data.error, 'bot');
+            return;
+        }
+
+        // Stream tokens into the bubble as Server-Sent Events arrive
+        const reader = res.body.getReader();
+        const decoder = new TextDecoder();
+        let buffer = '';
+        let answer = '';
+        let bubble = null;
+        while (true) {
+            const { value, done } = await reader.read();
+            if (done) break;
+            buffer += decoder.decode(value, { stream: true });
+            const events = buffer.split('\n\n');
+            buffer = events.pop();
+            for (const evt of events) {
+                const type = (evt.match(/^event: (.*)$/m) || [])[1];
+                const data = (evt.match(/^data: (.*)$/m) || [])[1];
+                if (type !== 'token' || !data) continue;
+                answer += JSON.parse(data).text;
+                if (!bubble) {
+                    hideTypingIndicator(typingId);
+                    bubble = addMessage(answer, 'bot');
+                } else {
+                    bubble.innerText = answer;
+                }
+            }
+        }
+        if (!bubble) {
+            hideTypingIndicator(typingId);
+            addMessage(answer || "Sorry, I couldn't get an answer.", 'bot');
+        }
     } catch (e) {
         hideTypingIndicator(typingId);
         addMessage("Sorry, I couldn't reach the server.", 'bot');
@@ -722,6 +756,7 @@ function addMessage(text, sender) {
     div.innerText = text;
     container.appendChild(div);
     container.scrollTop = container.scrollHeight;
+    return div;
 }
 async function generateAIAnalysis() {
     if (!currentTable) return;